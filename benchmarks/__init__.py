@@ -0,0 +1 @@
+# Бенчмарки и нагрузочные инструменты. Запуск из корня проекта: python -m benchmarks.<имя>
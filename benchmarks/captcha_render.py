@@ -0,0 +1,84 @@
+"""Микробенчмарк отрисовки капчи.
+
+Сравнивает прежнюю реализацию generate_captcha_image (1000 вызовов draw.point,
+загрузка шрифта на каждый вызов, RGB PNG) с текущей в форматах PNG и WebP:
+изображений в секунду и средний размер в байтах.
+
+    python -m benchmarks.captcha_render --count 500
+"""
+import argparse
+import random
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.captcha import generate_captcha_text, generate_captcha_image
+
+
+def legacy_generate_captcha_image(text):
+    """Прежняя реализация utils.captcha.generate_captcha_image"""
+    width = 200
+    height = 80
+    image = Image.new('RGB', (width, height), color='white')
+    draw = ImageDraw.Draw(image)
+
+    for _ in range(1000):
+        x = random.randint(0, width)
+        y = random.randint(0, height)
+        draw.point((x, y), fill='gray')
+
+    for _ in range(5):
+        x1 = random.randint(0, width)
+        y1 = random.randint(0, height)
+        x2 = random.randint(0, width)
+        y2 = random.randint(0, height)
+        draw.line([(x1, y1), (x2, y2)], fill='gray', width=1)
+
+    font_size = 45
+    try:
+        font = ImageFont.truetype("arial.ttf", font_size)
+    except OSError:
+        font = ImageFont.load_default()
+
+    text_width = font.getlength(text)
+    text_x = (width - text_width) // 2
+    text_y = (height - font_size) // 2
+    draw.text((text_x, text_y), text, font=font, fill='black')
+
+    img_byte_array = BytesIO()
+    image.save(img_byte_array, format='PNG')
+    img_byte_array.seek(0)
+    return img_byte_array.getvalue()
+
+
+def measure(render, count):
+    texts = [generate_captcha_text() for _ in range(count)]
+    render(texts[0])  # прогрев: кэш шрифта и шумовых масок
+    total_bytes = 0
+    started = time.perf_counter()
+    for text in texts:
+        total_bytes += len(render(text))
+    elapsed = time.perf_counter() - started
+    return count / elapsed, total_bytes / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500, help="images per implementation")
+    args = parser.parse_args()
+
+    implementations = (
+        ("legacy rgb png", legacy_generate_captcha_image),
+        ("paletted png", lambda text: generate_captcha_image(text, "png")),
+        ("webp", lambda text: generate_captcha_image(text, "webp")),
+    )
+    baseline = None
+    for name, render in implementations:
+        rate, size = measure(render, args.count)
+        baseline = baseline or rate
+        print(f"{name:>15}: {rate:8.1f} images/s (x{rate / baseline:.1f}), {size:8.0f} bytes/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Генератор больших баз данных бота для нагрузочных тестов.
+
+Создает схему через Database (с миграциями) и заполняет ее синтетическими
+данными: пользователи с хешами паролей, telegram_id и ссылками, каналы,
+задачи рассылки, версии приветствия, сохраненные file_id и состояния FSM.
+Данные детерминированы (--seed), поэтому базы одного размера сравнимы между запусками.
+
+    python -m benchmarks.db_fixtures --users 1000000 --path fixtures/users_1m.db
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+FIRST_TELEGRAM_ID = 100000
+# Доли авторизованных пользователей, пользователей со ссылкой и с сохраненным состоянием FSM
+AUTHORIZED_SHARE = 0.8
+LINK_SHARE = 0.7
+FSM_SHARE = 0.05
+BATCH_SIZE = 10000
+BOT_ID = 123456
+
+LINK_TEMPLATES = (
+    "https://example.com/u/{i}|Сайт",
+    "https://t.me/channel_{i}|Телеграм канал",
+    "http://portal{i}.info|САЙТ\nhttps://t.me/chat_{i}|Чат",
+)
+
+
+def telegram_id_of(user_id):
+    """telegram_id авторизованного пользователя в сгенерированной базе"""
+    return FIRST_TELEGRAM_ID + user_id
+
+
+def fsm_key(telegram_id):
+    """Ключ состояния FSM личного чата в формате utils.fsm_storage.storage_key"""
+    return f"{BOT_ID}:{telegram_id}:{telegram_id}::default"
+
+
+def _user_rows(users, password_hash, rng):
+    for user_id in range(1, users + 1):
+        telegram_id = telegram_id_of(user_id) if rng.random() < AUTHORIZED_SHARE else None
+        link = rng.choice(LINK_TEMPLATES).format(i=user_id) if rng.random() < LINK_SHARE else None
+        yield user_id, f"user{user_id}", password_hash, telegram_id, link
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fill(database, users, seed=0):
+    """Заполнение пустой базы; database - экземпляр Database"""
+    from utils.passwords import hash_password
+
+    rng = random.Random(seed)
+    # Настоящий scrypt-хеш один на всех: размер строк как в рабочей базе без часов вычислений
+    password_hash = hash_password("fixture-password")
+    now = time.time()
+    connection = database.connection
+
+    with connection:
+        for batch in _batches(_user_rows(users, password_hash, rng)):
+            connection.executemany(
+                "INSERT INTO users (id, username, password, telegram_id, link) VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+
+        connection.executemany(
+            "INSERT INTO channels (type, channel_id) VALUES (?, ?)",
+            [("links", "-1001000000001"), ("messages", "-1001000000002")]
+        )
+        payload = json.dumps({"kind": "text", "text": "Fixture broadcast"})
+        jobs = [(1, payload, "done", users, users, users) for _ in range(20)]
+        jobs.append((1, payload, "running", users // 2, users, users // 2))
+        connection.executemany(
+            "INSERT INTO broadcast_jobs (admin_id, payload, status, cursor, total, sent) VALUES (?, ?, ?, ?, ?, ?)",
+            jobs
+        )
+        connection.executemany(
+            "INSERT INTO welcome_messages (text, author_id) VALUES (?, ?)",
+            [(f"<b>Добро пожаловать!</b> Версия {version}", 1) for version in range(1, 11)]
+        )
+        connection.execute(
+            "INSERT INTO assets (path, sha256, file_id) VALUES (?, ?, ?)",
+            ("assets/logo.png", "0" * 64, "FIXTURE_FILE_ID")
+        )
+
+        # Половина состояний брошена больше суток назад и подлежит очистке
+        states = (
+            (
+                fsm_key(telegram_id_of(user_id)),
+                "AuthStates:waiting_for_password",
+                json.dumps({"username": f"user{user_id}"}),
+                now - 86400 * (rng.random() + (1 if rng.random() < 0.5 else 0)),
+            )
+            for user_id in range(1, users + 1) if rng.random() < FSM_SHARE
+        )
+        for batch in _batches(states):
+            connection.executemany(
+                "INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                batch
+            )
+
+
+def database_size(path):
+    """Размер файла базы вместе с WAL"""
+    return sum(os.path.getsize(name) for name in (path, path + "-wal") if os.path.exists(name))
+
+
+def create_fixture(path, users, seed=0):
+    """Создание базы path с users пользователями; существующая база переиспользуется"""
+    from database import Database
+
+    exists = os.path.exists(path)
+    database = Database(path)
+    if exists:
+        count = database.connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        if count != users:
+            database.close()
+            raise ValueError(f"{path} already contains {count} users, expected {users}")
+        return database
+    fill(database, users, seed)
+    database.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--path", required=True, help="файл создаваемой базы")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+    directory = os.path.dirname(args.path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    from benchmarks.fake_session import use_temp_database
+    # Глобальная база бота не должна создаваться рядом с фикстурой
+    use_temp_database(":memory:")
+
+    started = time.perf_counter()
+    database = create_fixture(args.path, args.users, args.seed)
+    database.close()
+    print(f"{args.users} users written to {args.path} in {time.perf_counter() - started:.1f}s "
+          f"({database_size(args.path) / 2 ** 20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""Методы Database и отчеты админа на 10 тысячах, 100 тысячах и миллионе пользователей.
+
+Для каждого размера база создается генератором benchmarks.db_fixtures (с
+--fixture-dir сгенерированные базы сохраняются и переиспользуются), копируется
+во временный каталог, и на копии измеряются:
+
+- точечные запросы и изменения - каждый метод Database --iterations раз со
+  случайными ключами, задержка p50/p99;
+- полные проходы (get_all_users, отчет "👥 Пользователи", выгрузка CSV, обход
+  получателей рассылки, очистка FSM) - время, пик памяти Python (tracemalloc)
+  и отметка, если время превышает --budget-ms.
+
+Также записывается размер файла базы. Результаты можно сохранить в JSON.
+
+    python -m benchmarks.db_scale --sizes 10000 100000 1000000 --fixture-dir fixtures --output db_scale.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.db_fixtures import create_fixture, database_size, fsm_key, telegram_id_of
+from benchmarks.event_loop_lag import percentile
+from benchmarks.fake_session import use_temp_database
+
+# Задача рассылки со статусом running в сгенерированной базе
+RUNNING_JOB_ID = 21
+
+
+def point_operations(database, users):
+    """Точечные методы: имя -> функция(rng), выполняющая один вызов"""
+    from utils.broadcast import BROADCAST_BATCH_SIZE
+    from utils.passwords import hash_password
+
+    password_hash = hash_password("benchmark-password")
+    added = []
+    counter = iter(range(10 ** 9))
+
+    def user_id(rng):
+        return rng.randint(1, users)
+
+    def add_user(rng):
+        added.append(database.add_user(f"new{next(counter)}", password_hash))
+
+    def delete_user(rng):
+        # Удаляем пользователей, добавленных add_user, чтобы не трогать данные фикстуры
+        database.delete_user(added.pop() if added else user_id(rng))
+
+    def same_username(rng):
+        uid = user_id(rng)
+        database.update_username(uid, f"user{uid}")
+
+    def same_telegram_id(rng):
+        uid = user_id(rng)
+        database.update_telegram_id(uid, telegram_id_of(uid))
+
+    def insert_users(rng):
+        prefix = f"import{next(counter)}_"
+        database.insert_users([(f"{prefix}{i}", password_hash, None) for i in range(100)])
+
+    return {
+        # Чтение
+        "get_user_by_telegram_id (cache miss)": lambda rng: database._fetch_user_by_telegram_id(telegram_id_of(user_id(rng))),
+        "get_user_by_username": lambda rng: database.get_user_by_username(f"user{user_id(rng)}"),
+        "get_user_by_id": lambda rng: database.get_user_by_id(user_id(rng)),
+        "get_password_hash": lambda rng: database.get_password_hash(f"user{user_id(rng)}"),
+        "get_existing_usernames (500)": lambda rng: database.get_existing_usernames(
+            f"user{user_id(rng)}" for _ in range(500)
+        ),
+        "get_users_page (after_id)": lambda rng: database.get_users_page(after_id=user_id(rng)),
+        "get_users_page (before_id)": lambda rng: database.get_users_page(before_id=user_id(rng)),
+        "get_channel": lambda rng: database.get_channel("links"),
+        "get_broadcast_job": lambda rng: database.get_broadcast_job(RUNNING_JOB_ID),
+        "get_broadcast_jobs": lambda rng: database.get_broadcast_jobs(("running", "paused")),
+        "get_broadcast_recipients": lambda rng: database.get_broadcast_recipients(
+            user_id(rng), 0, BROADCAST_BATCH_SIZE
+        ),
+        "get_welcome_message": lambda rng: database.get_welcome_message(),
+        "get_asset": lambda rng: database.get_asset("assets/logo.png"),
+        "get_fsm_record": lambda rng: database.get_fsm_record(fsm_key(telegram_id_of(user_id(rng)))),
+        # Изменения
+        "add_user": add_user,
+        "delete_user": delete_user,
+        "update_link": lambda rng: database.update_link(user_id(rng), f"https://example.com/new/{rng.random()}"),
+        "update_telegram_id": same_telegram_id,
+        "update_username": same_username,
+        "update_password": lambda rng: database.update_password(user_id(rng), password_hash),
+        "replace_password_hash": lambda rng: database.replace_password_hash(
+            user_id(rng), password_hash, password_hash
+        ),
+        "insert_users (100)": insert_users,
+        "set_channel": lambda rng: database.set_channel("links", "-1001000000001"),
+        "create_broadcast_job": lambda rng: database.create_broadcast_job(1, "{}", users),
+        "set_broadcast_progress_message": lambda rng: database.set_broadcast_progress_message(
+            RUNNING_JOB_ID, 1, 1
+        ),
+        "set_broadcast_status": lambda rng: database.set_broadcast_status(RUNNING_JOB_ID, "running"),
+        "update_broadcast_progress": lambda rng: database.update_broadcast_progress(
+            RUNNING_JOB_ID, user_id(rng), 100, 0, 0
+        ),
+        "add_welcome_message": lambda rng: database.add_welcome_message("<b>Добро пожаловать!</b>", 1),
+        "set_asset": lambda rng: database.set_asset("assets/logo.png", "0" * 64, "FIXTURE_FILE_ID"),
+        "delete_asset": lambda rng: database.delete_asset("assets/missing.png"),
+        "save_fsm_records": lambda rng: database.save_fsm_records(
+            [(fsm_key(telegram_id_of(user_id(rng))), "LinkStates:waiting_for_link", "{}", time.time())]
+        ),
+    }
+
+
+def scan_operations(database, users, directory):
+    """Полные проходы по таблицам: имя -> функция без аргументов"""
+    from utils.broadcast import BROADCAST_BATCH_SIZE
+    from utils.helpers import write_user_list
+    from utils.users_csv import write_users_csv
+
+    def admin_report():
+        # Как handlers.admin.cmd_admin: отчет пишется в файл построчно
+        with open(os.path.join(directory, "users.txt"), "w", encoding="utf-8") as file:
+            return write_user_list(database.iter_user_report(), file)
+
+    def csv_export():
+        with open(os.path.join(directory, "export.csv"), "w", newline="", encoding="utf-8-sig") as file:
+            return write_users_csv(database.iter_user_report(), file)
+
+    def broadcast_walk():
+        # Все пачки получателей одной рассылки, как их читает BroadcastWorker
+        cursor, total = 0, 0
+        while True:
+            batch = database.get_broadcast_recipients(cursor, 0, BROADCAST_BATCH_SIZE)
+            if not batch:
+                return total
+            cursor = batch[-1][0]
+            total += len(batch)
+
+    def import_check():
+        # Проверка занятых логинов при импорте файла на 10 тысяч строк
+        return database.get_existing_usernames(f"user{i}" for i in range(1, 10001))
+
+    return {
+        "get_all_users": database.get_all_users,
+        "admin report (iter_user_report)": admin_report,
+        "csv export": csv_export,
+        "count_broadcast_recipients": lambda: database.count_broadcast_recipients(0),
+        "broadcast recipients walk": broadcast_walk,
+        "import check (10k usernames)": import_check,
+        "delete_expired_fsm_records": lambda: database.delete_expired_fsm_records(time.time() - 86400),
+    }
+
+
+def measure_points(operations, iterations, seed):
+    results = {}
+    for name, operation in operations.items():
+        rng = random.Random(seed)
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            operation(rng)
+            latencies.append(time.perf_counter() - started)
+        results[name] = {
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 4),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        }
+    return results
+
+
+def measure_scans(operations, repeats, budget):
+    results = {}
+    for name, operation in operations.items():
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            operation()
+            timings.append(time.perf_counter() - started)
+        # Отдельный прогон под tracemalloc: он замедляет выполнение и не должен влиять на время
+        tracemalloc.start()
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        median = statistics.median(timings)
+        results[name] = {
+            "median_ms": round(median * 1000, 3),
+            "max_ms": round(max(timings) * 1000, 3),
+            "peak_mib": round(peak / 2 ** 20, 2),
+            "over_budget": median * 1000 > budget,
+        }
+    return results
+
+
+def fixture_path(fixture_dir, size, seed):
+    return os.path.join(fixture_dir, f"users_{size}_seed{seed}.db")
+
+
+def run_size(size, args, tmp):
+    fixture_dir = args.fixture_dir or tmp
+    os.makedirs(fixture_dir, exist_ok=True)
+    source = fixture_path(fixture_dir, size, args.seed)
+
+    started = time.perf_counter()
+    existed = os.path.exists(source)
+    create_fixture(source, size, args.seed).close()
+    generated = None if existed else round(time.perf_counter() - started, 2)
+
+    # Изменяющие методы работают с копией, фикстура остается нетронутой
+    path = os.path.join(tmp, f"bench_{size}.db")
+    shutil.copyfile(source, path)
+
+    from database import Database
+    database = Database(path)
+    try:
+        result = {
+            "users": size,
+            "fixture_seconds": generated,
+            "file_mib": round(database_size(source) / 2 ** 20, 2),
+            "points": measure_points(point_operations(database, size), args.iterations, args.seed),
+            "scans": measure_scans(scan_operations(database, size, tmp), args.repeats, args.budget_ms),
+        }
+    finally:
+        database.close()
+        for name in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(name):
+                os.remove(name)
+    return result
+
+
+def print_report(results, budget):
+    sizes = [result["users"] for result in results]
+    header = f"{'':<38}" + "".join(f"{size:>14}" for size in sizes)
+    print(header)
+    print(f"{'file size, MiB':<38}" + "".join(f"{result['file_mib']:>14.1f}" for result in results))
+
+    print("point queries, p50 / p99 ms")
+    for name in results[0]["points"]:
+        cells = (result["points"][name] for result in results)
+        print(f"  {name:<36}" + "".join(f"{cell['p50_ms']:>7.3f}/{cell['p99_ms']:<6.3f}" for cell in cells))
+
+    print(f"full scans, median ms (peak MiB); * - over {budget:.0f} ms budget")
+    for name in results[0]["scans"]:
+        cells = [result["scans"][name] for result in results]
+        print(f"  {name:<36}" + "".join(
+            f"{cell['median_ms']:>8.1f}{'*' if cell['over_budget'] else ' '}({cell['peak_mib']:>4.0f})"
+            for cell in cells
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--iterations", type=int, default=200, help="вызовов каждого точечного метода")
+    parser.add_argument("--repeats", type=int, default=3, help="повторов каждого полного прохода")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="допустимое время полного прохода")
+    parser.add_argument("--fixture-dir", help="каталог для сохранения и повторного использования баз")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Глобальная база бота создается при импорте database, направляем ее во временный каталог
+        use_temp_database(os.path.join(tmp, "bot.db"))
+        for size in args.sizes:
+            started = time.perf_counter()
+            results.append(run_size(size, args, tmp))
+            print(f"{size} users measured in {time.perf_counter() - started:.1f}s")
+
+    print_report(results, args.budget_ms)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"parameters": vars(args), "sizes": results}, file, ensure_ascii=False, indent=2)
+        print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
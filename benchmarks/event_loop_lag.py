@@ -0,0 +1,112 @@
+"""Задержка цикла событий при конкурентной нагрузке на базу данных.
+
+Сравнивает прямые синхронные вызовы Database из корутин с вызовами через
+AsyncDatabase. Пока обработчики читают пользователя и обновляют ссылку
+(каждое обновление - commit с fsync), отдельная задача каждые 5 мс измеряет,
+насколько цикл событий опаздывает с ее пробуждением.
+
+    python -m benchmarks.event_loop_lag --handlers 50 --iterations 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+PROBE_INTERVAL = 0.005
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def seed(database, users):
+    """Заполнение базы тестовыми пользователями"""
+    database.cursor.executemany(
+        "INSERT INTO users (username, password, telegram_id, link) VALUES (?, ?, ?, ?)",
+        ((f"user{i}", "password", 100000 + i, None) for i in range(users))
+    )
+    database.connection.commit()
+
+
+async def probe_lag(stop, samples):
+    """Измерение опоздания пробуждений цикла событий"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def run_scenario(mode, database, handlers, iterations, users):
+    from database import AsyncDatabase
+
+    facade = AsyncDatabase(database) if mode == "async" else None
+
+    async def call(name, *args):
+        if facade:
+            return await getattr(facade, name)(*args)
+        return getattr(database, name)(*args)
+
+    async def handler(index):
+        for i in range(iterations):
+            telegram_id = 100000 + (index * iterations + i) % users
+            user = await call("get_user_by_telegram_id", telegram_id)
+            await call("update_link", user[0], f"https://example.com/{index}/{i}")
+
+    stop = asyncio.Event()
+    samples = []
+    probe = asyncio.create_task(probe_lag(stop, samples))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(handlers)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    if facade:
+        await facade.close()
+    else:
+        database.close()
+
+    operations = handlers * iterations * 2
+    return {
+        "mode": mode,
+        "elapsed_s": elapsed,
+        "ops_per_s": operations / elapsed,
+        "lag_p50_ms": percentile(samples, 0.50) * 1000,
+        "lag_p99_ms": percentile(samples, 0.99) * 1000,
+        "lag_max_ms": max(samples, default=0.0) * 1000,
+        "lag_mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--handlers", type=int, default=50, help="concurrent handlers")
+    parser.add_argument("--iterations", type=int, default=20, help="read+write pairs per handler")
+    parser.add_argument("--users", type=int, default=1000, help="rows in the users table")
+    args = parser.parse_args()
+
+    # Импорт database создает глобальную базу по config.DATABASE_PATH; модуль импортируют
+    # другие бенчмарки ради percentile и probe_lag до того, как направят базу во временный файл
+    from database import Database
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("sync", "async"):
+            database = Database(os.path.join(tmp, f"{mode}.db"))
+            seed(database, args.users)
+            result = asyncio.run(run_scenario(mode, database, args.handlers, args.iterations, args.users))
+            print(
+                f"{result['mode']:>5}: {result['ops_per_s']:8.1f} ops/s in {result['elapsed_s']:.2f}s | "
+                f"loop lag p50 {result['lag_p50_ms']:.2f} ms, p99 {result['lag_p99_ms']:.2f} ms, "
+                f"max {result['lag_max_ms']:.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Поддельная сессия Bot API и синтетические обновления для нагрузочных тестов.
+
+FakeSession не ходит в сеть: запросы бота записываются и сразу получают
+правдоподобный ответ (с необязательной задержкой, имитирующей Telegram).
+"""
+import asyncio
+import itertools
+import time
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import CopyMessage, SendDocument, SendMessage, SendPhoto, EditMessageText
+from aiogram.types import Chat, Message, MessageId, PhotoSize
+
+import config
+
+_ids = itertools.count(1000)
+
+
+def use_temp_database(path):
+    """Направляет глобальную базу бота в path. Вызывать до импорта database и handlers."""
+    config.DATABASE_PATH = path
+
+
+def seed_users(database, users, first_telegram_id=100000):
+    """Заполнение базы авторизованными пользователями"""
+    database.cursor.executemany(
+        "INSERT INTO users (username, password, telegram_id, link) VALUES (?, ?, ?, ?)",
+        ((f"user{i}", "password", first_telegram_id + i, f"https://example.com/{i}") for i in range(users))
+    )
+    database.connection.commit()
+
+
+class FakeSession(BaseSession):
+    """Сессия, отвечающая на запросы без обращения к Telegram"""
+
+    def __init__(self, latency=0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(method, CopyMessage):
+            return MessageId(message_id=next(_ids))
+        if isinstance(method, (SendMessage, SendPhoto, SendDocument, EditMessageText)):
+            chat_id = getattr(method, "chat_id", None)
+            fields = dict(
+                message_id=next(_ids),
+                date=int(time.time()),
+                chat=Chat(id=chat_id if isinstance(chat_id, int) else 1, type="private"),
+                text=getattr(method, "text", None),
+            )
+            if isinstance(method, SendPhoto):
+                fields["photo"] = [PhotoSize(file_id="FAKE_FILE_ID", file_unique_id="fake", width=1, height=1)]
+            return Message.model_validate(fields, context={"bot": bot})
+        return True
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+
+def _user(telegram_id):
+    return {"id": telegram_id, "is_bot": False, "first_name": f"User {telegram_id}"}
+
+
+def message_update(telegram_id, text):
+    """Обновление с текстовым сообщением в виде JSON-словаря Bot API"""
+    return {
+        "update_id": next(_ids),
+        "message": {
+            "message_id": next(_ids),
+            "date": int(time.time()),
+            "chat": {"id": telegram_id, "type": "private"},
+            "from": _user(telegram_id),
+            "text": text,
+        },
+    }
+
+
+def callback_update(telegram_id, data):
+    """Обновление с нажатием инлайн-кнопки в виде JSON-словаря Bot API"""
+    return {
+        "update_id": next(_ids),
+        "callback_query": {
+            "id": str(next(_ids)),
+            "chat_instance": "benchmark",
+            "from": _user(telegram_id),
+            "data": data,
+            "message": {
+                "message_id": next(_ids),
+                "date": int(time.time()),
+                "chat": {"id": telegram_id, "type": "private"},
+                "text": "menu",
+            },
+        },
+    }
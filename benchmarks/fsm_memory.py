@@ -0,0 +1,72 @@
+"""Память процесса при брошенных сценариях FSM.
+
+Каждый пользователь начинает сценарий (состояние капчи с текстом в данных)
+и не заканчивает его. Сравнивается объем памяти, который после этого держит
+MemoryStorage и SQLiteStorage (tracemalloc, без учета кэша страниц SQLite).
+
+    python -m benchmarks.fsm_memory --users 10000 50000 100000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_session import use_temp_database
+
+_offsets = itertools.count(10 ** 9, 10 ** 8)
+
+
+async def abandon_flows(storage, users, offset):
+    from aiogram.fsm.storage.base import StorageKey
+    from models import AuthStates
+
+    for i in range(users):
+        telegram_id = offset + i
+        key = StorageKey(bot_id=1, chat_id=telegram_id, user_id=telegram_id)
+        await storage.set_state(key, AuthStates.waiting_for_captcha)
+        await storage.update_data(key, {"captcha_text": "ABCDE"})
+
+
+async def measure(name, storage, users):
+    tracemalloc.start()
+    started = time.perf_counter()
+    await abandon_flows(storage, users, offset=next(_offsets))
+    if hasattr(storage, "flush"):
+        await storage.flush()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<14} {current / 1024 / 1024:8.1f} MiB  {users / elapsed:8.0f} flows/s")
+
+
+async def run(args):
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from database import db
+    from utils.fsm_storage import SQLiteStorage
+
+    for users in args.users:
+        print(f"users={users}")
+        await measure("MemoryStorage", MemoryStorage(), users)
+        storage = SQLiteStorage(cache_size=args.cache_size)
+        await storage.start()
+        await measure("SQLiteStorage", storage, users)
+        await storage.close()
+    await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--cache-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_database(os.path.join(tmp, "fsm_memory.db"))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
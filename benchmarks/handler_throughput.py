@@ -0,0 +1,348 @@
+"""Пропускная способность обработчиков auth, user и admin.
+
+Синтетические обновления проходят через настоящий Dispatcher из
+handlers.register_all_handlers с SQLiteStorage, бот работает с FakeSession
+(запросы к Bot API записываются без сети). Каждый сценарий - набор
+пользовательских сценариев-потоков: обновления одного пользователя идут
+последовательно, разные пользователи обрабатываются параллельно (--clients).
+
+Для каждого сценария измеряются обновления в секунду и задержка обработки
+одного обновления (p50/p99); результаты сохраняются в JSON, а с --baseline
+сравниваются с прошлым запуском.
+
+С --mock-api запросы идут по HTTP в benchmarks.mock_bot_api, который может
+имитировать задержку, ответы 429 и пользователей, заблокировавших бота;
+ответы 429 и 403 на сообщения обработчиков считаются ошибками обновлений.
+
+--dispatch выбирает диспетчер: ordered - utils.dispatch.OrderedDispatcher, как
+в bot.py, plain - обычный Dispatcher aiogram. С --arrival burst все обновления
+запускаются сразу отдельными задачами в порядке поступления, как при поллинге,
+без ожидания обработки предыдущего обновления пользователя. После сценариев
+login и set_link проверяется, что каждый пользователь дошел до конца: с
+обычным Dispatcher обновления одного пользователя обгоняют друг друга и часть
+входов и ссылок теряется.
+
+    python -m benchmarks.handler_throughput --users 500 --clients 50 --output results.json
+    python -m benchmarks.handler_throughput --baseline results.json
+    python -m benchmarks.handler_throughput --mock-api --latency 0.05 --global-rate 30 --blocked-share 0.05
+    python -m benchmarks.handler_throughput --arrival burst --dispatch plain --scenarios login set_link
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from aiogram.dispatcher.event.bases import UNHANDLED
+
+from benchmarks.event_loop_lag import percentile
+from benchmarks.fake_session import FakeSession, use_temp_database, seed_users, message_update, callback_update
+from benchmarks.mock_bot_api import add_mock_arguments, from_arguments
+
+PASSWORD = "benchmark-password"
+FIRST_TELEGRAM_ID = 100000
+# Пользователи без аккаунта (сценарий /start) и аккаунты для входа
+GUEST_TELEGRAM_ID = 800000
+LOGIN_TELEGRAM_ID = 900000
+
+SCENARIOS = ("start_captcha", "login", "set_link", "my_link", "broadcast")
+
+
+def seed_login_accounts(database, count):
+    """Аккаунты login{i} без привязки к Telegram с настоящим scrypt-хешем пароля"""
+    from utils.passwords import hash_password
+
+    password_hash = hash_password(PASSWORD)
+    database.cursor.executemany(
+        "INSERT INTO users (username, password) VALUES (?, ?)",
+        ((f"login{i}", password_hash) for i in range(count))
+    )
+    database.connection.commit()
+
+
+def build_flows(name, args, admin_id):
+    """Обновления сценария: список потоков, каждый - обновления одного пользователя по порядку"""
+    users = range(args.users)
+    if name == "start_captcha":
+        return [[message_update(GUEST_TELEGRAM_ID + i, "/start")] for i in users]
+    if name == "login":
+        return [
+            [
+                message_update(LOGIN_TELEGRAM_ID + i, "/login"),
+                message_update(LOGIN_TELEGRAM_ID + i, f"login{i}"),
+                message_update(LOGIN_TELEGRAM_ID + i, PASSWORD),
+            ]
+            for i in users
+        ]
+    if name == "set_link":
+        return [
+            [
+                callback_update(FIRST_TELEGRAM_ID + i, "set_link"),
+                message_update(FIRST_TELEGRAM_ID + i, f"https://example.com/new/{i}|Сайт"),
+            ]
+            for i in users
+        ]
+    if name == "my_link":
+        return [[message_update(FIRST_TELEGRAM_ID + i, "🔗 Мое актуальное")] for i in users]
+    if name == "broadcast":
+        return [[message_update(admin_id, "/broadcast"), message_update(admin_id, "Benchmark broadcast")]]
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def check_scenario(name, database, users):
+    """Сколько пользователей сценария не дошли до конца (None - проверки нет)"""
+    if name == "login":
+        done = database.cursor.execute(
+            "SELECT COUNT(*) FROM users WHERE username LIKE 'login%' AND telegram_id IS NOT NULL"
+        ).fetchone()[0]
+    elif name == "set_link":
+        done = database.cursor.execute(
+            "SELECT COUNT(*) FROM users WHERE link LIKE 'https://example.com/new/%'"
+        ).fetchone()[0]
+    else:
+        return None
+    return users - done
+
+
+async def wait_broadcasts(db, timeout):
+    """Ожидание завершения всех запущенных рассылок.
+
+    Возвращает последнюю закончившуюся задачу (done, paused или cancelled)
+    или None, если рассылка так и не была создана.
+    """
+    deadline = time.monotonic() + timeout
+    while await db.get_broadcast_jobs(("running",)):
+        if time.monotonic() > deadline:
+            raise TimeoutError("broadcast did not finish in time")
+        await asyncio.sleep(0.05)
+    jobs = await db.get_broadcast_jobs(("done", "paused", "cancelled"))
+    return jobs[-1] if jobs else None
+
+
+async def run_scenario(name, flows, feed, clients, arrival="sequential"):
+    """Прогон потоков обновлений; feed(update) обрабатывает одно обновление до конца.
+
+    sequential - clients пользователей одновременно, следующее обновление
+    пользователя отправляется после обработки предыдущего; burst - все
+    обновления сразу, по очереди из каждого потока, как их отдает getUpdates.
+    """
+    latencies = []
+    errors = 0
+    unhandled = 0
+
+    async def process(update):
+        nonlocal errors, unhandled
+        started = time.perf_counter()
+        try:
+            # Ни один обработчик не подошел (например, состояние FSM еще не установлено)
+            # или OrderedDispatcher отбросил обновление из переполненной очереди
+            if await feed(update) is UNHANDLED:
+                unhandled += 1
+        except Exception as e:
+            errors += 1
+            logging.getLogger(__name__).debug(f"Update failed in {name}: {e}")
+        latencies.append(time.perf_counter() - started)
+
+    queue = list(reversed(flows))
+
+    async def client():
+        while queue:
+            for update in queue.pop():
+                await process(update)
+
+    started = time.perf_counter()
+    if arrival == "burst":
+        updates = (update for step in itertools.zip_longest(*flows) for update in step if update)
+        await asyncio.gather(*(asyncio.create_task(process(update)) for update in updates))
+    else:
+        await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "updates": len(latencies),
+        "errors": errors,
+        "unhandled": unhandled,
+        "elapsed_s": round(elapsed, 4),
+        "updates_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0) * 1000, 3),
+    }
+
+
+async def run(args):
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.types import Update
+
+    from config import ADMIN_IDS, BOT_TOKEN
+    from database import db
+    from handlers import register_all_handlers
+    from utils.broadcast import BroadcastEngine, broadcast_worker
+    from utils.captcha_pool import captcha_pool
+    from utils.dispatch import OrderedDispatcher, UserLanes
+    from utils.fsm_storage import SQLiteStorage
+    from utils.notifications import link_notifier, admin_notifier
+    from utils.outbox import outbox
+
+    seed_users(db.sync, args.recipients, FIRST_TELEGRAM_ID)
+    seed_login_accounts(db.sync, args.users)
+
+    mock = None
+    if args.mock_api:
+        mock = from_arguments(args)
+        await mock.start()
+        session = AiohttpSession(api=mock.api_server())
+    else:
+        session = FakeSession(latency=args.latency)
+    # Число запросов к Bot API считает тот, кто на них отвечает
+    api = mock or session
+    bot = Bot(token=BOT_TOKEN, session=session)
+    storage = SQLiteStorage()
+    if args.dispatch == "ordered":
+        dp = OrderedDispatcher(storage=storage, lanes=UserLanes(concurrency=args.concurrency))
+    else:
+        dp = Dispatcher(storage=storage)
+    register_all_handlers(dp)
+
+    # Без ограничения скорости рассылка на 10 тысяч длилась бы минуты
+    broadcast_worker.engine = BroadcastEngine(rate=args.broadcast_rate, per_chat_interval=0)
+
+    await storage.start()
+    await captcha_pool.start()
+    # Процессы рендеринга запускаются через forkserver несколько секунд; ждем первых
+    # капч, чтобы этот однократный запуск не попал в задержку start_captcha
+    while len(captcha_pool) < captcha_pool.min_size:
+        await asyncio.sleep(0.05)
+    outbox.start(bot)
+    link_notifier.start()
+
+    async def feed(update):
+        return await dp.feed_update(bot, Update.model_validate(update, context={"bot": bot}))
+
+    results = {}
+    try:
+        for name in args.scenarios:
+            flows = build_flows(name, args, ADMIN_IDS[0])
+            requests_before = api.requests
+            result = await run_scenario(name, flows, feed, args.clients, args.arrival)
+            result["incomplete_users"] = check_scenario(name, db.sync, args.users)
+            if name == "broadcast":
+                started = time.perf_counter()
+                try:
+                    job = await wait_broadcasts(db, args.timeout)
+                except TimeoutError as e:
+                    job, result["failure"] = None, str(e)
+                elapsed = time.perf_counter() - started
+                if job:
+                    _, status, _, sent, failed, blocked = job
+                    result.update(broadcast_status=status, broadcast_s=round(elapsed, 3), broadcast_sent=sent,
+                                  broadcast_failed=failed, broadcast_blocked=blocked)
+                    result["broadcast_messages_per_s"] = (
+                        round((sent + failed + blocked) / elapsed, 1) if elapsed else 0.0
+                    )
+                else:
+                    # Например, ответы админу на /broadcast получили 429 и задача не создана
+                    result.setdefault("failure", "no broadcast job finished")
+            result["bot_requests"] = api.requests - requests_before
+            results[name] = result
+            print_result(name, result)
+    finally:
+        await broadcast_worker.stop()
+        await link_notifier.stop()
+        await admin_notifier.stop()
+        await outbox.stop()
+        await captcha_pool.stop()
+        await storage.close()
+        await db.close()
+        await session.close()
+        if mock:
+            await mock.stop()
+    return results
+
+
+def print_result(name, result):
+    line = (
+        f"  {name:<14} {result['updates_per_s']:9.1f} updates/s | p50 {result['p50_ms']:8.2f} ms, "
+        f"p99 {result['p99_ms']:8.2f} ms | {result['bot_requests']} bot requests"
+    )
+    if "broadcast_messages_per_s" in result:
+        line += (
+            f" | broadcast {result['broadcast_status']}, {result['broadcast_messages_per_s']:.0f} msg/s, "
+            f"sent {result['broadcast_sent']}, blocked {result['broadcast_blocked']}, failed {result['broadcast_failed']}"
+        )
+    if result.get("failure"):
+        line += f" | FAILED: {result['failure']}"
+    if result["errors"]:
+        line += f" | {result['errors']} FAILED"
+    if result["unhandled"]:
+        line += f" | {result['unhandled']} unhandled"
+    if result["incomplete_users"]:
+        line += f" | {result['incomplete_users']} users INCOMPLETE"
+    print(line)
+
+
+def compare(results, baseline):
+    """Изменение относительно прошлого запуска; рост p99 или падение пропускной способности видно сразу"""
+    print("compared to baseline:")
+    for name, result in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        changes = []
+        for key in ("updates_per_s", "p50_ms", "p99_ms"):
+            if previous.get(key):
+                changes.append(f"{key} {(result[key] - previous[key]) / previous[key] * 100:+6.1f}%")
+        print(f"  {name:<14} " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=500, help="пользователей в каждом сценарии")
+    parser.add_argument("--clients", type=int, default=50, help="пользователей, обрабатываемых параллельно")
+    parser.add_argument("--recipients", type=int, default=10000, help="авторизованных пользователей (получателей рассылки)")
+    parser.add_argument("--broadcast-rate", type=float, default=10000, help="сообщений рассылки в секунду")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--dispatch", choices=("ordered", "plain"), default="ordered",
+                        help="OrderedDispatcher из bot.py или обычный Dispatcher")
+    parser.add_argument("--concurrency", type=int, default=64, help="обновлений одновременно в OrderedDispatcher")
+    parser.add_argument("--arrival", choices=("sequential", "burst"), default="sequential",
+                        help="обновления пользователя по одному или все сразу, как при поллинге")
+    parser.add_argument("--mock-api", action="store_true", help="отправлять запросы в benchmarks.mock_bot_api по HTTP")
+    add_mock_arguments(parser)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    args = parser.parse_args()
+    args.recipients = max(args.recipients, args.users)
+
+    logging.basicConfig(level=logging.WARNING)
+    print(f"users={args.users} clients={args.clients} recipients={args.recipients} "
+          f"latency={args.latency * 1000:.0f}ms dispatch={args.dispatch} arrival={args.arrival}")
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_database(os.path.join(tmp, "handler_throughput.db"))
+        results = asyncio.run(run(args))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            compare(results, json.load(file))
+    if args.output:
+        report = {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+            "scenarios": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
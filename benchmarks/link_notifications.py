@@ -0,0 +1,78 @@
+"""Число сообщений в канал ссылок в час пик.
+
+Пользователи несколько раз подряд правят ссылки (часть правок ничего не
+меняет). Сравнивается прежняя схема - сообщение на каждое изменение - с
+LinkNotifier. Время сжато: debounce и окна задаются в долях секунды.
+
+    python -m benchmarks.link_notifications --users 200 --edits 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.fake_session import FakeSession, use_temp_database
+
+
+async def run(args):
+    from aiogram import Bot
+    from config import BOT_TOKEN
+    from database import db
+    from utils.notifications import LinkNotifier
+    from utils.outbox import outbox
+
+    await db.set_channel("links", "-1001")
+    session = FakeSession()
+    bot = Bot(token=BOT_TOKEN, session=session)
+    notifier = LinkNotifier(debounce=args.debounce, max_delay=args.debounce * 4,
+                            batch_window=args.debounce / 2)
+    outbox.start(bot)
+    notifier.start()
+
+    links = {user_id: f"https://example.com/{user_id}" for user_id in range(args.users)}
+    naive_calls = 0
+
+    async def user(user_id):
+        nonlocal naive_calls
+        for _ in range(args.edits):
+            await asyncio.sleep(random.uniform(0, args.spread))
+            old_link = links[user_id]
+            if random.random() >= args.noop_share:
+                links[user_id] = f"https://example.com/{user_id}/{random.randrange(10 ** 6)}"
+            # Прежняя схема отправляла сообщение на каждую правку
+            naive_calls += 1
+            notifier.notify(user_id, f"user{user_id}", old_link, links[user_id])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(user_id) for user_id in range(args.users)))
+    await asyncio.sleep(args.debounce * 5)
+    await notifier.stop()
+    await outbox.stop()
+    elapsed = time.perf_counter() - started
+    await db.close()
+
+    stats = notifier.stats()
+    print(f"users={args.users} edits={args.edits} noop_share={args.noop_share} ({elapsed:.1f}s)")
+    print(f"  per-update messages: {naive_calls}")
+    print(f"  notifier messages:   {session.requests} "
+          f"(dropped {stats['dropped']} no-op, coalesced {stats['coalesced']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=5, help="правок на пользователя")
+    parser.add_argument("--noop-share", type=float, default=0.2, help="доля правок без изменений")
+    parser.add_argument("--spread", type=float, default=0.1, help="пауза между правками, до N секунд")
+    parser.add_argument("--debounce", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_database(os.path.join(tmp, "link_notifications.db"))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Пропускная способность входа со scrypt-хешами паролей.
+
+Одновременно выполняется --concurrency входов (всего --logins), пока отдельная
+задача измеряет опоздание цикла событий. Режим pool - AsyncDatabase.authenticate_user
+(хеш считается в пуле password_hasher), inline - та же проверка прямо в цикле событий.
+
+    python -m benchmarks.login_throughput --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.event_loop_lag import percentile, probe_lag
+
+PASSWORD = "correct horse battery staple"
+
+
+def seed(database, users, password_hash):
+    database.cursor.executemany(
+        "INSERT INTO users (username, password) VALUES (?, ?)",
+        ((f"user{i}", password_hash) for i in range(users))
+    )
+    database.connection.commit()
+
+
+async def run_scenario(mode, db, logins, concurrency, users):
+    from utils.passwords import verify_password
+
+    async def pool_login(username):
+        return await db.authenticate_user(username, PASSWORD)
+
+    async def inline_login(username):
+        user_id, stored = db.sync.get_password_hash(username)
+        return user_id if verify_password(PASSWORD, stored) else None
+
+    login = pool_login if mode == "pool" else inline_login
+    queue = list(range(logins))
+    failed = 0
+
+    async def client():
+        nonlocal failed
+        while queue:
+            i = queue.pop()
+            if not await login(f"user{i % users}"):
+                failed += 1
+
+    stop = asyncio.Event()
+    samples = []
+    probe = asyncio.create_task(probe_lag(stop, samples))
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    print(
+        f"  {mode:<7} {logins / elapsed:8.1f} logins/s | loop lag p50 {percentile(samples, 0.5) * 1000:7.1f} ms, "
+        f"p99 {percentile(samples, 0.99) * 1000:7.1f} ms, max {max(samples, default=0) * 1000:7.1f} ms"
+        f"{f' | {failed} FAILED' if failed else ''}"
+    )
+
+
+async def run(args):
+    from database import Database, AsyncDatabase
+    from utils.passwords import hash_password, PASSWORD_HASH_WORKERS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(os.path.join(tmp, "logins.db"))
+        seed(database, args.users, hash_password(PASSWORD))
+        db = AsyncDatabase(database)
+        print(f"logins={args.logins} concurrency={args.concurrency} hash workers={PASSWORD_HASH_WORKERS}")
+        for mode in args.modes:
+            await run_scenario(mode, db, args.logins, args.concurrency, args.users)
+        await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--modes", nargs="+", choices=["pool", "inline"], default=["pool", "inline"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Локальная замена Bot API для нагрузочных тестов без обращения к Telegram.
+
+aiohttp-сервер принимает запросы по адресам /bot<token>/<method>, как настоящий
+Bot API, поэтому бот работает с ним через обычную AiohttpSession и
+TelegramAPIServer (в config достаточно указать TELEGRAM_API_SERVER).
+sendMessage, sendPhoto, sendDocument, copyMessage и editMessageText возвращают
+правдоподобные объекты, остальные методы - true. Сервер умеет имитировать:
+
+- задержку ответа (--latency, --jitter);
+- 429 Too Many Requests с retry_after: случайную долю ответов (--flood-share)
+  и превышение общего лимита отправки (--global-rate сообщений в секунду);
+- 403 "bot was blocked by the user" для доли личных чатов (--blocked-share),
+  один и тот же чат заблокирован во всех запросах.
+
+Каждый вызов пишется в JSON Lines журнал (--log), счетчики по методам и
+статусам доступны на GET /stats. Обновления для поллинга можно передать
+через POST /updates (JSON-объект или список), бот получит их в getUpdates.
+
+    python -m benchmarks.mock_bot_api --port 8081 --latency 0.05 --flood-share 0.01 --blocked-share 0.02
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+import zlib
+from collections import Counter, deque
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_METHODS = {"sendmessage", "sendphoto", "senddocument", "editmessagetext"}
+# Методы, на которые распространяются лимиты и блокировка пользователем
+SEND_METHODS = MESSAGE_METHODS | {"copymessage", "sendsticker", "sendvideo", "sendaudio", "sendvoice", "sendanimation"}
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Mock Bot", "username": "mock_bot"}
+
+
+def _error(code, description, **parameters):
+    body = {"ok": False, "error_code": code, "description": description}
+    if parameters:
+        body["parameters"] = parameters
+    return code, body
+
+
+class MockBotAPI:
+    """Имитация Bot API; start() поднимает сервер, stop() останавливает"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, flood_share=0.0,
+                 retry_after=1, global_rate=None, blocked_share=0.0, log_path=None, seed=0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_share = flood_share
+        self.retry_after = retry_after
+        self.global_rate = global_rate
+        self.blocked_share = blocked_share
+        self.log_path = log_path
+        self.requests = 0
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._window_start = 0
+        self._window_count = 0
+        self._updates = deque()
+        self._update_ids = itertools.count(1)
+        self._new_updates = asyncio.Event()
+        self._log = None
+        self._runner = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def api_server(self):
+        """TelegramAPIServer для AiohttpSession бота"""
+        from aiogram.client.telegram import TelegramAPIServer
+
+        return TelegramAPIServer.from_base(self.url)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_post("/updates", self.handle_push_updates)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # При port=0 порт выбирает система
+        self.port = self._runner.addresses[0][1]
+        if self.log_path:
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        logger.info(f"Mock Bot API listening on {self.url}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def push_update(self, update):
+        """Постановка обновления в очередь getUpdates; update_id назначается, если не указан"""
+        update = dict(update)
+        update.setdefault("update_id", next(self._update_ids))
+        self._updates.append(update)
+        self._new_updates.set()
+
+    def is_blocked(self, chat_id):
+        """Заблокировал ли бота пользователь; решение постоянно для каждого чата"""
+        if not self.blocked_share or not isinstance(chat_id, int) or chat_id < 0:
+            return False
+        return zlib.crc32(str(chat_id).encode()) % 10000 < self.blocked_share * 10000
+
+    def _over_global_rate(self):
+        if not self.global_rate:
+            return False
+        second = int(time.monotonic())
+        if second != self._window_start:
+            self._window_start, self._window_count = second, 0
+        self._window_count += 1
+        return self._window_count > self.global_rate
+
+    async def handle_method(self, request):
+        started = time.perf_counter()
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        params.update(request.query)
+        chat_id = _chat_id(params.get("chat_id"))
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        status, body = await self._respond(method.lower(), params, chat_id)
+
+        self.requests += 1
+        self.stats[(method, status)] += 1
+        if self._log:
+            self._log.write(json.dumps({
+                "time": time.time(),
+                "method": method,
+                "chat_id": chat_id,
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "description": body.get("description"),
+            }, ensure_ascii=False) + "\n")
+        return web.json_response(body, status=status)
+
+    async def _respond(self, method, params, chat_id):
+        if method in SEND_METHODS:
+            if self.is_blocked(chat_id):
+                return _error(403, "Forbidden: bot was blocked by the user")
+            if self._over_global_rate() or self._random.random() < self.flood_share:
+                return _error(429, f"Too Many Requests: retry after {self.retry_after}",
+                              retry_after=self.retry_after)
+
+        if method == "getupdates":
+            return 200, {"ok": True, "result": await self._get_updates(params)}
+        if method == "getme":
+            return 200, {"ok": True, "result": BOT_USER}
+        if method == "copymessage":
+            return 200, {"ok": True, "result": {"message_id": next(self._ids)}}
+        if method in MESSAGE_METHODS:
+            return 200, {"ok": True, "result": self._message(method, params, chat_id)}
+        return 200, {"ok": True, "result": True}
+
+    def _message(self, method, params, chat_id):
+        message = {
+            "message_id": int(params.get("message_id") or next(self._ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id if isinstance(chat_id, int) else 1, "type": "private"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if method == "sendphoto":
+            message["photo"] = [{"file_id": f"MOCK_PHOTO_{message['message_id']}",
+                                 "file_unique_id": "mock", "width": 1, "height": 1}]
+        if method == "senddocument":
+            message["document"] = {"file_id": f"MOCK_DOCUMENT_{message['message_id']}", "file_unique_id": "mock"}
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        return message
+
+    async def _get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates:
+            # Долгий опрос, как у настоящего getUpdates
+            self._new_updates.clear()
+            waiter = asyncio.ensure_future(self._new_updates.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=float(params.get("timeout") or 0))
+            finally:
+                waiter.cancel()
+        limit = int(params.get("limit") or 100)
+        return list(itertools.islice(self._updates, limit))
+
+    async def handle_stats(self, request):
+        calls = {}
+        for (method, status), count in sorted(self.stats.items()):
+            calls.setdefault(method, {})[str(status)] = count
+        return web.json_response({"requests": self.requests, "calls": calls, "pending_updates": len(self._updates)})
+
+    async def handle_push_updates(self, request):
+        updates = await request.json()
+        for update in updates if isinstance(updates, list) else [updates]:
+            self.push_update(update)
+        return web.json_response({"ok": True, "queued": len(self._updates)})
+
+
+def _chat_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        # @username канала или отсутствующий chat_id
+        return value
+
+
+def add_mock_arguments(parser):
+    """Параметры имитации для тестов, которые могут работать с MockBotAPI"""
+    group = parser.add_argument_group("mock Bot API")
+    group.add_argument("--latency", type=float, default=0.0, help="задержка ответа Bot API, секунды")
+    group.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, до N секунд")
+    group.add_argument("--flood-share", type=float, default=0.0, help="доля ответов 429")
+    group.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, секунды")
+    group.add_argument("--global-rate", type=int, help="сообщений в секунду до ответов 429")
+    group.add_argument("--blocked-share", type=float, default=0.0, help="доля пользователей, заблокировавших бота")
+    group.add_argument("--log", help="JSON Lines журнал вызовов")
+    return group
+
+
+def from_arguments(args, **kwargs):
+    return MockBotAPI(
+        latency=args.latency, jitter=args.jitter, flood_share=args.flood_share, retry_after=args.retry_after,
+        global_rate=args.global_rate, blocked_share=args.blocked_share, log_path=args.log, **kwargs
+    )
+
+
+async def serve(args):
+    mock = from_arguments(args, host=args.host, port=args.port)
+    await mock.start()
+    print(f"Mock Bot API: {mock.url} (set TELEGRAM_API_SERVER = \"{mock.url}\" in config)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await mock.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_mock_arguments(parser)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
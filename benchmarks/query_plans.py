@@ -0,0 +1,108 @@
+"""Проверка миграций схемы и планов горячих запросов.
+
+Создает базу в старой схеме (без версии, с повторяющимися записями channels),
+открывает ее через Database, проверяет, что миграции применились и дубликаты
+удалены, а затем через EXPLAIN QUERY PLAN - что горячие запросы используют
+индексы, а не полный просмотр таблицы. При ошибке завершается с кодом 1.
+
+    python -m benchmarks.query_plans
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+from database import Database, MIGRATIONS
+
+# (запрос, параметры, фрагмент ожидаемого плана)
+HOT_QUERIES = [
+    ("SELECT id, username, link FROM users WHERE telegram_id = ?", (1,),
+     "USING INDEX sqlite_autoindex_users_2"),
+    ("SELECT id, password FROM users WHERE username = ?", ("user",),
+     "USING INDEX sqlite_autoindex_users_1"),
+    ("SELECT id, username, telegram_id FROM users WHERE id > ? ORDER BY id LIMIT ?", (0, 11),
+     "USING INTEGER PRIMARY KEY"),
+    ("SELECT id, username, telegram_id FROM users WHERE id < ? ORDER BY id DESC LIMIT ?", (100, 11),
+     "USING INTEGER PRIMARY KEY"),
+    ("SELECT id, telegram_id FROM users WHERE id > ? AND telegram_id IS NOT NULL AND telegram_id != ? "
+     "ORDER BY id LIMIT ?", (0, 1, 100),
+     "USING INTEGER PRIMARY KEY"),
+    ("SELECT channel_id FROM channels WHERE type = ?", ("links",),
+     "USING INDEX idx_channels_type"),
+    ("SELECT id, status, total, sent, failed, blocked FROM broadcast_jobs WHERE status IN (?, ?) ORDER BY id",
+     ("running", "paused"), "USING INDEX idx_broadcast_jobs_status"),
+    ("SELECT state, data, updated_at FROM fsm_states WHERE key = ?", ("key",),
+     "USING INDEX sqlite_autoindex_fsm_states_1"),
+    ("DELETE FROM fsm_states WHERE updated_at < ?", (0,),
+     "USING INDEX idx_fsm_states_updated_at"),
+]
+
+
+def create_legacy_database(path):
+    """База в схеме до появления миграций: channels без уникального ключа и с дубликатами"""
+    connection = sqlite3.connect(path)
+    connection.executescript('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            telegram_id INTEGER UNIQUE,
+            link TEXT
+        );
+        CREATE TABLE channels (
+            id INTEGER PRIMARY KEY,
+            type TEXT NOT NULL,
+            channel_id TEXT NOT NULL
+        );
+        INSERT INTO channels (type, channel_id) VALUES
+            ('links', '-1001'), ('messages', '-2001'), ('links', '-1002'), ('links', '-1003');
+    ''')
+    connection.commit()
+    connection.close()
+
+
+def check(condition, description, failures):
+    print(f"  {'ok  ' if condition else 'FAIL'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "legacy.db")
+        create_legacy_database(path)
+        database = Database(path)
+
+        print("migrations:")
+        version = database.connection.execute("PRAGMA user_version").fetchone()[0]
+        check(version == MIGRATIONS[-1][0], f"user_version = {version}", failures)
+        channels = database.connection.execute("SELECT type, channel_id FROM channels ORDER BY type").fetchall()
+        check(channels == [("links", "-1003"), ("messages", "-2001")], f"channels deduplicated: {channels}", failures)
+        database.set_channel("links", "-1004")
+        check(database.get_channel("links") == "-1004", "set_channel updates the existing row", failures)
+        count = database.connection.execute("SELECT COUNT(*) FROM channels").fetchone()[0]
+        check(count == 2, f"channels rows after set_channel: {count}", failures)
+
+        # Повторное открытие не должно ничего менять
+        database.close()
+        database = Database(path)
+        version = database.connection.execute("PRAGMA user_version").fetchone()[0]
+        check(version == MIGRATIONS[-1][0], "reopening keeps the schema version", failures)
+
+        print("query plans:")
+        for query, params, expected in HOT_QUERIES:
+            plan = " | ".join(
+                row[3] for row in database.connection.execute(f"EXPLAIN QUERY PLAN {query}", params)
+            )
+            check(expected in plan, f"{query[:60]}... -> {plan}", failures)
+        database.close()
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
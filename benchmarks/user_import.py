@@ -0,0 +1,71 @@
+"""Скорость массового импорта пользователей из CSV.
+
+Сравнивает запись по одному пользователю с фиксацией каждой вставки (как
+при добавлении через диалог) с insert_users - executemany в одной транзакции.
+Пароли в обоих случаях заранее захешированы, чтобы измерялась запись в базу;
+с --end-to-end дополнительно выполняется AsyncDatabase.import_users с
+хешированием каждого пароля.
+
+    python -m benchmarks.user_import --sizes 1000 10000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from database import Database, AsyncDatabase
+from utils.passwords import hash_password
+from utils.users_csv import parse_users_csv
+
+
+def make_csv(size):
+    lines = ["username,password,link"]
+    lines.extend(f"partner{i},secret{i},https://example.com/{i}" for i in range(size))
+    return "\n".join(lines).encode()
+
+
+def measure(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--end-to-end", action="store_true", help="также импорт с хешированием паролей")
+    args = parser.parse_args()
+
+    password_hash = hash_password("secret")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            parse_elapsed, (users, errors) = measure(parse_users_csv, make_csv(size))
+            rows = [(username, password_hash, link) for _, username, _, link in users]
+
+            single = Database(os.path.join(tmp, f"single_{size}.db"))
+            single_elapsed, _ = measure(lambda: [single.add_user(username, password) for username, password, _ in rows])
+            single.close()
+
+            bulk = Database(os.path.join(tmp, f"bulk_{size}.db"))
+            bulk_elapsed, conflicts = measure(bulk.insert_users, rows)
+
+            print(
+                f"{size:>7} users | parse {parse_elapsed * 1000:7.1f} ms | "
+                f"row by row {single_elapsed * 1000:8.1f} ms | one transaction {bulk_elapsed * 1000:7.1f} ms "
+                f"({single_elapsed / bulk_elapsed:.0f}x)"
+            )
+
+            if args.end_to_end:
+                db = AsyncDatabase(Database(os.path.join(tmp, f"e2e_{size}.db")))
+                plain = [(username, f"secret{i}", link) for i, (_, username, _, link) in enumerate(users)]
+                started = time.perf_counter()
+                asyncio.run(db.import_users(plain))
+                elapsed = time.perf_counter() - started
+                print(f"{'':>7}       | with scrypt hashing {elapsed:.1f} s ({size / elapsed:.1f} rows/s)")
+                asyncio.run(db.close())
+            bulk.close()
+
+
+if __name__ == "__main__":
+    main()
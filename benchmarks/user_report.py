@@ -0,0 +1,78 @@
+"""Построение отчета "👥 Пользователи" на больших таблицах.
+
+Сравнивает прежний способ (get_all_users + get_user_by_username на каждую
+строку + конкатенация через +=) с одним запросом iter_user_report и сборкой
+через join. Время на строку должно оставаться постоянным при росте таблицы.
+
+    python -m benchmarks.user_report --sizes 10000 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from database import Database
+from utils.helpers import format_user_list, split_message
+
+
+def seed(database, users):
+    """Заполнение базы тестовыми пользователями"""
+    database.cursor.executemany(
+        "INSERT INTO users (username, password, telegram_id, link) VALUES (?, ?, ?, ?)",
+        (
+            (f"user{i}", f"password{i}", 100000 + i if i % 2 else None, f"https://example.com/{i}|Сайт")
+            for i in range(users)
+        )
+    )
+    database.connection.commit()
+
+
+def legacy_report(database):
+    """Отчет в том виде, как он строился раньше: N+1 запросов и +="""
+    users = database.get_all_users()
+    report = "📊 Список всех пользователей:\n\n"
+    for user_id, username, telegram_id, link in users:
+        user_data = database.get_user_by_username(username)
+        password = user_data[1] if user_data else "Не найден"
+        report += f"ID: {user_id} | Логин: {username}\n"
+        report += f"   Пароль: {password}\n"
+        report += f"   Статус: {'✅ Авторизован' if telegram_id else '❌ Не авторизован'}\n"
+        report += f"   Информация: {link or '—'}\n\n"
+    return report
+
+
+def measure(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--skip-legacy", action="store_true", help="do not run the N+1 implementation")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            database = Database(os.path.join(tmp, f"report_{size}.db"))
+            seed(database, size)
+
+            elapsed, report = measure(lambda: format_user_list(database.iter_user_report()))
+            chunks = split_message(report)
+            print(
+                f"{size:>8} users | single query: {elapsed * 1000:8.1f} ms "
+                f"({elapsed / size * 1e6:.2f} us/row, {len(report) // 1000}k chars, {len(chunks)} messages)"
+            )
+
+            if not args.skip_legacy:
+                legacy_elapsed, _ = measure(legacy_report, database)
+                print(
+                    f"{'':>8}       | N+1 legacy:   {legacy_elapsed * 1000:8.1f} ms "
+                    f"({legacy_elapsed / size * 1e6:.2f} us/row, x{legacy_elapsed / elapsed:.1f} slower)"
+                )
+            database.close()
+
+
+if __name__ == "__main__":
+    main()
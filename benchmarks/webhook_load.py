@@ -0,0 +1,138 @@
+"""Пропускная способность режима вебхука от HTTP-запроса до завершения обработчика.
+
+Поднимает aiohttp-приложение из utils.webhook на локальном порту, бот работает
+с FakeSession (без обращения к Telegram). Клиенты отправляют синтетические
+обновления авторизованных пользователей ("Мое актуальное" и инлайн-кнопку
+просмотра ссылки) с секретным токеном; измеряется, сколько обновлений в секунду
+принимается и полностью обрабатывается. С --mock-api ответы бота уходят по HTTP
+в benchmarks.mock_bot_api.
+
+    python -m benchmarks.webhook_load --updates 5000 --clients 50 --concurrency 64
+    python -m benchmarks.webhook_load --mock-api --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.fake_session import FakeSession, use_temp_database, seed_users, message_update, callback_update
+from benchmarks.mock_bot_api import add_mock_arguments, from_arguments
+
+SECRET = "benchmark-secret"
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+FIRST_TELEGRAM_ID = 100000
+
+
+async def run(args):
+    from aiohttp import ClientSession
+    from aiohttp.test_utils import TestServer
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.fsm.storage.memory import MemoryStorage
+
+    from config import BOT_TOKEN
+    from database import db
+    from handlers import register_all_handlers
+    from utils.dispatch import OrderedDispatcher, UserLanes
+    from utils.webhook import create_webhook_app
+
+    seed_users(db.sync, args.users, FIRST_TELEGRAM_ID)
+
+    mock = None
+    if args.mock_api:
+        mock = from_arguments(args)
+        await mock.start()
+        session = AiohttpSession(api=mock.api_server())
+    else:
+        session = FakeSession(latency=args.latency)
+    bot = Bot(token=BOT_TOKEN, session=session)
+    # Как в bot.py; ограничение одновременной обработки переходит к диспетчеру
+    lanes = UserLanes(concurrency=args.concurrency)
+    dp = OrderedDispatcher(storage=MemoryStorage(), lanes=lanes)
+    register_all_handlers(dp)
+
+    processed = 0
+    done = asyncio.Event()
+    feed_update = dp.feed_update
+
+    # Считаем вокруг feed_update, а не в middleware: обновления, отброшенные из
+    # переполненной очереди пользователя, до middleware не доходят
+    async def counted_feed_update(bot, update, **kwargs):
+        nonlocal processed
+        try:
+            return await feed_update(bot, update, **kwargs)
+        finally:
+            processed += 1
+            if processed >= args.updates:
+                done.set()
+
+    dp.feed_update = counted_feed_update
+
+    app = create_webhook_app(dp, bot, path="/webhook", secret_token=SECRET, concurrency=args.concurrency)
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    url = str(server.make_url("/webhook"))
+
+    def make_update():
+        telegram_id = FIRST_TELEGRAM_ID + random.randrange(args.users)
+        if random.random() < 0.5:
+            return message_update(telegram_id, "🔗 Мое актуальное")
+        return callback_update(telegram_id, "my_link")
+
+    updates = [make_update() for _ in range(args.updates)]
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+
+    async with ClientSession() as client:
+        # Запрос без секрета должен отклоняться
+        async with client.post(url, json=make_update()) as response:
+            rejected = response.status == 401
+
+        async def worker():
+            while not queue.empty():
+                update = queue.get_nowait()
+                async with client.post(url, json=update, headers={SECRET_HEADER: SECRET}) as response:
+                    response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.clients)))
+        accepted_at = time.perf_counter() - started
+        await asyncio.wait_for(done.wait(), timeout=args.timeout)
+        elapsed = time.perf_counter() - started
+
+    await server.close()
+    await db.close()
+    await session.close()
+    if mock:
+        await mock.stop()
+
+    print(f"updates={args.updates} clients={args.clients} concurrency={args.concurrency} "
+          f"latency={args.latency * 1000:.0f}ms")
+    print(f"  secret check:  {'ok' if rejected else 'FAILED'}")
+    print(f"  accepted:      {args.updates / accepted_at:8.0f} updates/s")
+    print(f"  processed:     {args.updates / elapsed:8.0f} updates/s ({elapsed:.2f}s)")
+    print(f"  dropped:       {lanes.dropped} (user queue full)")
+    print(f"  bot requests:  {(mock or session).requests}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=50, help="параллельных HTTP-клиентов")
+    parser.add_argument("--concurrency", type=int, default=64, help="одновременно обрабатываемых обновлений")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--mock-api", action="store_true", help="отправлять запросы в benchmarks.mock_bot_api по HTTP")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_database(os.path.join(tmp, "webhook_load.db"))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
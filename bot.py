@@ -4,11 +4,24 @@ import asyncio
 import signal
 import sys
 import traceback
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+import config
 from config import BOT_TOKEN
 from handlers import register_all_handlers
+from handlers.admin import stop_imports
 from database import db
+from utils.broadcast import broadcast_worker
+from utils.captcha_pool import captcha_pool
+from utils.dispatch import OrderedDispatcher
+from utils.fsm_storage import SQLiteStorage
+from utils.notifications import link_notifier, admin_notifier
+from utils.outbox import outbox
+from utils.passwords import password_hasher
+from utils.metrics import setup_metrics, metrics_server
+from utils.tracing import setup_tracing, exporter as trace_exporter
+from utils.webhook import WEBHOOK_URL, run_webhook
 
 # Настройка логирования
 logging.basicConfig(
@@ -18,49 +31,66 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Инициализация бота и диспетчера
-bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
-
-async def send_channel_notification(username, link):
-    """Отправка уведомления в канал о новой ссылке"""
-    try:
-        # Получаем ID канала из базы данных
-        channel_id = db.get_channel("links")
-        if not channel_id:
-            logger.warning("Links channel not configured")
-            return
-
-        await bot.send_message(
-            channel_id,
-            f"📢 Пользователь обновил ссылки!\n"
-            f"👤 Пользователь: {username}\n"
-            f"🔗 Ссылки: \n{link}"
-        )
-        logger.info(f"Notification sent to channel about user {username}")
-    except Exception as e:
-        logger.error(f"Failed to send channel notification: {e}")
+# Собственный сервер Bot API (например, benchmarks.mock_bot_api для нагрузочных тестов)
+TELEGRAM_API_SERVER = getattr(config, "TELEGRAM_API_SERVER", None)
 
-# Middleware для обработки результатов от process_link
-class NotificationMiddleware:
-    async def __call__(self, handler, event, data):
-        result = await handler(event, data)
-        if isinstance(result, dict) and 'username' in result and 'link' in result:
-            await send_channel_notification(result['username'], result['link'])
-        return result
+# Инициализация бота и диспетчера
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_SERVER)) if TELEGRAM_API_SERVER else None
+bot = Bot(token=BOT_TOKEN, session=session)
+storage = SQLiteStorage()
+# Обновления разных пользователей обрабатываются параллельно, одного - по порядку
+dp = OrderedDispatcher(storage=storage)
 
 async def on_startup():
     """Действия при запуске бота"""
     logger.info("Бот запущен")
+    
+    # Страница метрик для Prometheus и запись трасс
+    await metrics_server.start()
+    trace_exporter.start()
+    
+    # Фоновая запись состояний FSM и очистка брошенных
+    await storage.start()
+    
+    # Заполняем пул капч в фоне
+    await captcha_pool.start()
+    
+    # Возобновляем рассылки, прерванные перезапуском
+    await broadcast_worker.start(bot)
+    
+    # Фоновая отправка уведомлений в каналы
+    outbox.start(bot)
+    link_notifier.start()
 
 async def on_shutdown():
     """Действия при остановке бота"""
     logger.info("Завершение работы бота...")
     
+    # Больше не принимаем обновления и дожидаемся уже начатых, чтобы обработчики
+    # не обращались к остановленным ниже пулам и базе
+    await dp.lanes.close()
+    
+    # Останавливаем рассылки, прогресс уже сохранен в базе
+    await broadcast_worker.stop()
+    await captcha_pool.stop()
+    # Прерываем фоновые импорты пользователей, записанные пачки сохранены
+    await stop_imports()
+    # Дожидаемся начатых вычислений хешей паролей и останавливаем их потоки;
+    # shutdown(wait=True) блокирует, поэтому выполняется вне цикла событий
+    await asyncio.to_thread(password_hasher.close)
+    await link_notifier.stop()
+    await admin_notifier.stop()
+    await outbox.stop()
+    await metrics_server.stop()
+    await trace_exporter.stop()
+    
+    # Записываем отложенные изменения состояний FSM, пока база еще открыта
+    # (aiogram не закрывает хранилище сам)
+    await storage.close()
+    
     # Закрываем подключение к базе данных
     try:
-        db.close()
+        await db.close()
         logger.info("Соединение с базой данных закрыто")
     except Exception as e:
         logger.error(f"Ошибка при закрытии соединения с базой данных: {e}")
@@ -77,8 +107,11 @@ async def main():
         # Регистрация всех обработчиков
         register_all_handlers(dp)
         
-        # Добавление middleware
-        dp.message.middleware.register(NotificationMiddleware())
+        # Метрики обработчиков и запросов к Bot API
+        setup_metrics(dp, bot)
+        
+        # Трассировка обновлений в TRACE_FILE
+        setup_tracing(dp, bot)
         
         # Запуск бота
         await on_startup()
@@ -93,8 +126,19 @@ async def main():
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
         
-        # Запускаем поллинг
-        await dp.start_polling(bot, skip_updates=True)
+        if WEBHOOK_URL:
+            # Вебхук: обновления приходят во встроенный aiohttp-сервер
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, stop.set)
+                except NotImplementedError:
+                    pass
+            await run_webhook(dp, bot, stop)
+        else:
+            # Запускаем поллинг
+            await dp.start_polling(bot, skip_updates=True)
         
     except KeyboardInterrupt:
         logger.info("Бот остановлен по запросу пользователя")
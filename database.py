@@ -1,15 +1,97 @@
 import sqlite3
+import asyncio
+import functools
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
 from config import DATABASE_PATH
+from utils.cache import TTLCache, MISSING
+from utils.passwords import password_hasher, needs_rehash
+from utils.metrics import registry, Gauge, CallbackCounter, DB_QUERY_DURATION, DB_QUEUE_WAIT
+from utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Параметры SQLite, переопределяются в config
+DB_SYNCHRONOUS = getattr(config, "DB_SYNCHRONOUS", "NORMAL")
+DB_CACHE_SIZE = getattr(config, "DB_CACHE_SIZE", -16000)  # отрицательное значение - размер в КиБ
+DB_MMAP_SIZE = getattr(config, "DB_MMAP_SIZE", 64 * 1024 * 1024)
+DB_BUSY_TIMEOUT = getattr(config, "DB_BUSY_TIMEOUT", 5000)
+DB_READERS = getattr(config, "DB_READERS", 4)
+USER_CACHE_SIZE = getattr(config, "USER_CACHE_SIZE", 10000)
+USER_CACHE_TTL = getattr(config, "USER_CACHE_TTL", 300)
+# Сколько паролей импорта хешируется и записывается за один шаг
+IMPORT_BATCH_SIZE = getattr(config, "IMPORT_BATCH_SIZE", 100)
+
+# Миграции схемы поверх таблиц из _create_tables: (версия, SQL-запросы).
+# Номер последней примененной версии хранится в PRAGMA user_version,
+# каждая миграция выполняется в отдельной транзакции.
+MIGRATIONS = [
+    (1, [
+        # set_channel делал INSERT OR REPLACE без уникального ключа и добавлял строки;
+        # оставляем последнюю запись каждого типа
+        "DELETE FROM channels WHERE id NOT IN (SELECT MAX(id) FROM channels GROUP BY type)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_channels_type ON channels (type)",
+    ]),
+    (2, [
+        "CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_status ON broadcast_jobs (status)",
+        "CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states (updated_at)",
+    ]),
+]
+
+def writes(method):
+    """Метод, изменяющий данные: выполняется на соединении-писателе под блокировкой"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    wrapper.writes = True
+    return wrapper
+
 class Database:
-    def __init__(self):
-        """Инициализация соединения с базой данных"""
-        self.connection = sqlite3.connect(DATABASE_PATH)
+    def __init__(self, path=None):
+        """Инициализация соединения с базой данных.
+
+        Для записи используется одно соединение-писатель, для чтения - отдельное
+        соединение только для чтения в каждом потоке. В режиме WAL читатели
+        не ждут завершения записи.
+        """
+        self.path = path or DATABASE_PATH
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        # telegram_id -> (id, username, link) или None для неавторизованных
+        self.user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+        # Соединение используется из потоков AsyncDatabase, а не из потока, где создано
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._configure(self.connection)
         self.cursor = self.connection.cursor()
         self._create_tables()
+        self._migrate()
+
+    def _configure(self, connection):
+        """Применение настроек производительности к соединению"""
+        connection.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        connection.execute(f"PRAGMA cache_size={int(DB_CACHE_SIZE)}")
+        connection.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+        connection.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT)}")
+
+    def _read_cursor(self):
+        """Курсор соединения для чтения, принадлежащего текущему потоку"""
+        connection = getattr(self._local, "reader", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._configure(connection)
+            connection.execute("PRAGMA query_only=ON")
+            self._local.reader = connection
+            with self._readers_lock:
+                self._readers.append(connection)
+        return connection.cursor()
     
     def _create_tables(self):
         """Создание необходимых таблиц, если они не существуют"""
@@ -30,54 +112,180 @@ class Database:
             channel_id TEXT NOT NULL
         )
         ''')
+        
+        # Задачи рассылки: cursor - id последнего пользователя, которому рассылка уже отправлена
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS broadcast_jobs (
+            id INTEGER PRIMARY KEY,
+            admin_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            cursor INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            blocked INTEGER NOT NULL DEFAULT 0,
+            progress_chat_id INTEGER,
+            progress_message_id INTEGER,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            finished_at TEXT
+        )
+        ''')
+        
+        # Версии приветственного сообщения, актуальна последняя
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS welcome_messages (
+            version INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            author_id INTEGER,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        
+        # file_id загруженных в Telegram статических файлов и хеш содержимого, для которого он получен
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assets (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        
+        # Состояния FSM: key - ключ хранилища aiogram, data - JSON, updated_at - unix time
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at REAL NOT NULL
+        )
+        ''')
         self.connection.commit()
     
-    def add_user(self, username, password):
-        """Добавление нового пользователя"""
+    def _migrate(self):
+        """Применение миграций, которые еще не применены к базе"""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in MIGRATIONS:
+            if target <= version:
+                continue
+            try:
+                self.cursor.execute("BEGIN IMMEDIATE")
+                for statement in statements:
+                    self.cursor.execute(statement)
+                self.cursor.execute(f"PRAGMA user_version = {int(target)}")
+                self.connection.commit()
+            except sqlite3.Error as e:
+                self.connection.rollback()
+                logger.error(f"Ошибка при применении миграции {target}: {e}")
+                raise
+            logger.info(f"Схема базы данных обновлена до версии {target}")
+            version = target
+    
+    @writes
+    def add_user(self, username, password_hash):
+        """Добавление нового пользователя, возвращает его id или False, если логин занят"""
         try:
             self.cursor.execute(
                 "INSERT INTO users (username, password) VALUES (?, ?)",
-                (username, password)
+                (username, password_hash)
             )
             self.connection.commit()
-            return True
+            return self.cursor.lastrowid
         except sqlite3.IntegrityError:
             logger.error(f"Пользователь {username} уже существует")
             return False
     
-    def authenticate_user(self, username, password):
-        """Проверка учетных данных пользователя"""
+    def get_existing_usernames(self, usernames, cursor=None):
+        """Логины из usernames, которые уже заняты"""
+        cursor = cursor or self._read_cursor()
+        usernames = list(usernames)
+        existing = set()
+        # Запросы пачками, чтобы не упереться в лимит параметров SQLite
+        for start in range(0, len(usernames), 500):
+            chunk = usernames[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(f"SELECT username FROM users WHERE username IN ({placeholders})", chunk)
+            existing.update(row[0] for row in cursor.fetchall())
+        return existing
+    
+    @writes
+    def insert_users(self, users):
+        """Добавление пользователей одной транзакцией.
+
+        users - список (username, password_hash, link). Возвращает множество логинов,
+        которые оказались заняты и не были добавлены.
+        """
+        with self.connection:
+            conflicts = self.get_existing_usernames((username for username, _, _ in users), self.cursor)
+            self.cursor.executemany(
+                "INSERT INTO users (username, password, link) VALUES (?, ?, ?) "
+                "ON CONFLICT(username) DO NOTHING",
+                [user for user in users if user[0] not in conflicts]
+            )
+        return conflicts
+    
+    def get_password_hash(self, username):
+        """Данные для проверки пароля: (id, хеш пароля) или None"""
+        cursor = self._read_cursor()
+        cursor.execute("SELECT id, password FROM users WHERE username = ?", (username,))
+        return cursor.fetchone()
+    
+    @writes
+    def replace_password_hash(self, user_id, old_hash, new_hash):
+        """Замена хеша, если пароль не успели изменить с момента проверки"""
         self.cursor.execute(
-            "SELECT id FROM users WHERE username = ? AND password = ?",
-            (username, password)
+            "UPDATE users SET password = ? WHERE id = ? AND password = ?",
+            (new_hash, user_id, old_hash)
         )
-        user = self.cursor.fetchone()
-        return user[0] if user else None
+        self.connection.commit()
     
+    @writes
     def update_telegram_id(self, user_id, telegram_id):
         """Обновление Telegram ID пользователя"""
+        old_telegram_id = self._telegram_id_of(user_id)
         self.cursor.execute(
             "UPDATE users SET telegram_id = ? WHERE id = ?",
             (telegram_id, user_id)
         )
         self.connection.commit()
+        self.user_cache.invalidate(old_telegram_id, telegram_id)
+    
+    def _telegram_id_of(self, user_id):
+        """Telegram ID пользователя на соединении-писателе (для инвалидации кэша)"""
+        self.cursor.execute("SELECT telegram_id FROM users WHERE id = ?", (user_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
     
     def get_user_by_telegram_id(self, telegram_id):
         """Получение информации о пользователе по Telegram ID"""
-        self.cursor.execute(
+        user = self.user_cache.get(telegram_id)
+        if user is not MISSING:
+            return user
+        return self._fetch_user_by_telegram_id(telegram_id)
+    
+    def _fetch_user_by_telegram_id(self, telegram_id):
+        """Чтение пользователя из базы с сохранением результата в кэш"""
+        generation = self.user_cache.generation
+        cursor = self._read_cursor()
+        cursor.execute(
             "SELECT id, username, link FROM users WHERE telegram_id = ?",
             (telegram_id,)
         )
-        return self.cursor.fetchone()
+        user = cursor.fetchone()
+        self.user_cache.set(telegram_id, user, generation)
+        return user
     
     def get_user_by_username(self, username):
         """Получение информации о пользователе по имени пользователя"""
-        self.cursor.execute(
+        cursor = self._read_cursor()
+        cursor.execute(
             "SELECT id, password, telegram_id, link FROM users WHERE username = ?",
             (username,)
         )
-        return self.cursor.fetchone()
+        return cursor.fetchone()
     
+    @writes
     def update_link(self, user_id, link):
         """Обновление ссылки пользователя"""
         self.cursor.execute(
@@ -85,22 +293,42 @@ class Database:
             (link, user_id)
         )
         self.connection.commit()
+        self.user_cache.invalidate(self._telegram_id_of(user_id))
     
     def get_all_users(self):
         """Получение списка всех пользователей для админа"""
-        self.cursor.execute("SELECT id, username, telegram_id, link FROM users")
-        return self.cursor.fetchall()
+        cursor = self._read_cursor()
+        cursor.execute("SELECT id, username, telegram_id, link FROM users")
+        return cursor.fetchall()
+    
+    def iter_user_report(self, batch_size=1000):
+        """Построчный обход всех данных для отчета по пользователям одним запросом.
+
+        Генератор читает курсор пачками, поэтому вызывать его нужно в том же потоке,
+        где он обходится (например, внутри db.read).
+        """
+        cursor = self._read_cursor()
+        cursor.execute("SELECT id, username, telegram_id, link FROM users ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
     
+    @writes
     def delete_user(self, user_id):
         """Удаление пользователя"""
         try:
+            telegram_id = self._telegram_id_of(user_id)
             self.cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
             self.connection.commit()
+            self.user_cache.invalidate(telegram_id)
             return True
         except sqlite3.Error as e:
             logger.error(f"Ошибка при удалении пользователя: {e}")
             return False
     
+    @writes
     def update_username(self, user_id, new_username):
         """Изменение логина пользователя"""
         try:
@@ -109,6 +337,7 @@ class Database:
                 (new_username, user_id)
             )
             self.connection.commit()
+            self.user_cache.invalidate(self._telegram_id_of(user_id))
             return True
         except sqlite3.IntegrityError:
             logger.error(f"Пользователь с логином {new_username} уже существует")
@@ -117,12 +346,13 @@ class Database:
             logger.error(f"Ошибка при изменении логина: {e}")
             return False
     
-    def update_password(self, user_id, new_password):
+    @writes
+    def update_password(self, user_id, password_hash):
         """Изменение пароля пользователя"""
         try:
             self.cursor.execute(
                 "UPDATE users SET password = ? WHERE id = ?",
-                (new_password, user_id)
+                (password_hash, user_id)
             )
             self.connection.commit()
             return True
@@ -132,17 +362,50 @@ class Database:
     
     def get_user_by_id(self, user_id):
         """Получение информации о пользователе по ID"""
-        self.cursor.execute(
+        cursor = self._read_cursor()
+        cursor.execute(
             "SELECT username, telegram_id, link FROM users WHERE id = ?",
             (user_id,)
         )
-        return self.cursor.fetchone()
+        return cursor.fetchone()
+    
+    def get_users_page(self, after_id=0, before_id=None, limit=10):
+        """Страница пользователей с keyset-пагинацией по id.
+
+        Возвращает (rows, has_prev, has_next), где rows - [(id, username, telegram_id)].
+        Стоимость запроса зависит только от размера страницы, а не от размера таблицы.
+        """
+        cursor = self._read_cursor()
+        if before_id is not None:
+            cursor.execute(
+                "SELECT id, username, telegram_id FROM users WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (before_id, limit + 1)
+            )
+            rows = cursor.fetchall()
+            has_prev = len(rows) > limit
+            rows = rows[:limit][::-1]
+            has_next = True
+        else:
+            cursor.execute(
+                "SELECT id, username, telegram_id FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit + 1)
+            )
+            rows = cursor.fetchall()
+            has_next = len(rows) > limit
+            rows = rows[:limit]
+            has_prev = False
+            if rows:
+                cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE id < ?)", (rows[0][0],))
+                has_prev = bool(cursor.fetchone()[0])
+        return rows, has_prev, has_next
         
+    @writes
     def set_channel(self, channel_type, channel_id):
         """Установка или обновление канала определенного типа"""
         try:
             self.cursor.execute(
-                "INSERT OR REPLACE INTO channels (type, channel_id) VALUES (?, ?)",
+                "INSERT INTO channels (type, channel_id) VALUES (?, ?) "
+                "ON CONFLICT(type) DO UPDATE SET channel_id = excluded.channel_id",
                 (channel_type, channel_id)
             )
             self.connection.commit()
@@ -153,20 +416,318 @@ class Database:
 
     def get_channel(self, channel_type):
         """Получение ID канала по типу"""
+        cursor = self._read_cursor()
         try:
-            self.cursor.execute(
+            cursor.execute(
                 "SELECT channel_id FROM channels WHERE type = ?",
                 (channel_type,)
             )
-            result = self.cursor.fetchone()
+            result = cursor.fetchone()
             return result[0] if result else None
         except sqlite3.Error as e:
             logger.error(f"Ошибка при получении канала: {e}")
             return None
 
+    @writes
+    def create_broadcast_job(self, admin_id, payload, total):
+        """Создание задачи рассылки, payload - JSON с содержимым рассылки"""
+        self.cursor.execute(
+            "INSERT INTO broadcast_jobs (admin_id, payload, total) VALUES (?, ?, ?)",
+            (admin_id, payload, total)
+        )
+        self.connection.commit()
+        return self.cursor.lastrowid
+
+    @writes
+    def set_broadcast_progress_message(self, job_id, chat_id, message_id):
+        """Сохранение сообщения, в котором отображается прогресс рассылки"""
+        self.cursor.execute(
+            "UPDATE broadcast_jobs SET progress_chat_id = ?, progress_message_id = ? WHERE id = ?",
+            (chat_id, message_id, job_id)
+        )
+        self.connection.commit()
+
+    def get_broadcast_job(self, job_id):
+        """Получение задачи рассылки по ID"""
+        cursor = self._read_cursor()
+        cursor.execute(
+            "SELECT id, admin_id, payload, status, cursor, total, sent, failed, blocked, "
+            "progress_chat_id, progress_message_id FROM broadcast_jobs WHERE id = ?",
+            (job_id,)
+        )
+        return cursor.fetchone()
+
+    def get_broadcast_jobs(self, statuses):
+        """Получение ID задач рассылки с указанными статусами"""
+        cursor = self._read_cursor()
+        placeholders = ", ".join("?" for _ in statuses)
+        cursor.execute(
+            f"SELECT id, status, total, sent, failed, blocked FROM broadcast_jobs "
+            f"WHERE status IN ({placeholders}) ORDER BY id",
+            tuple(statuses)
+        )
+        return cursor.fetchall()
+
+    @writes
+    def set_broadcast_status(self, job_id, status):
+        """Изменение статуса задачи рассылки"""
+        finished = status in ("done", "cancelled")
+        self.cursor.execute(
+            "UPDATE broadcast_jobs SET status = ?, "
+            "finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE finished_at END "
+            "WHERE id = ?",
+            (status, finished, job_id)
+        )
+        self.connection.commit()
+
+    @writes
+    def update_broadcast_progress(self, job_id, cursor, sent, failed, blocked):
+        """Фиксация обработанной пачки получателей"""
+        self.cursor.execute(
+            "UPDATE broadcast_jobs SET cursor = ?, sent = sent + ?, failed = failed + ?, "
+            "blocked = blocked + ? WHERE id = ?",
+            (cursor, sent, failed, blocked, job_id)
+        )
+        self.connection.commit()
+
+    def count_broadcast_recipients(self, exclude_telegram_id):
+        """Количество авторизованных пользователей, кроме отправителя"""
+        cursor = self._read_cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM users WHERE telegram_id IS NOT NULL AND telegram_id != ?",
+            (exclude_telegram_id,)
+        )
+        return cursor.fetchone()[0]
+
+    def get_broadcast_recipients(self, after_id, exclude_telegram_id, limit):
+        """Следующая пачка получателей рассылки после пользователя с ID after_id"""
+        cursor = self._read_cursor()
+        cursor.execute(
+            "SELECT id, telegram_id FROM users "
+            "WHERE id > ? AND telegram_id IS NOT NULL AND telegram_id != ? "
+            "ORDER BY id LIMIT ?",
+            (after_id, exclude_telegram_id, limit)
+        )
+        return cursor.fetchall()
+
+    def get_welcome_message(self):
+        """Последняя версия приветственного сообщения: (version, text) или None"""
+        cursor = self._read_cursor()
+        cursor.execute("SELECT version, text FROM welcome_messages ORDER BY version DESC LIMIT 1")
+        return cursor.fetchone()
+
+    @writes
+    def add_welcome_message(self, text, author_id=None):
+        """Сохранение новой версии приветственного сообщения, возвращает номер версии"""
+        self.cursor.execute(
+            "INSERT INTO welcome_messages (text, author_id) VALUES (?, ?)",
+            (text, author_id)
+        )
+        self.connection.commit()
+        return self.cursor.lastrowid
+
+    def get_asset(self, path):
+        """Сохраненный file_id статического файла: (sha256, file_id) или None"""
+        cursor = self._read_cursor()
+        cursor.execute("SELECT sha256, file_id FROM assets WHERE path = ?", (path,))
+        return cursor.fetchone()
+
+    @writes
+    def set_asset(self, path, sha256, file_id):
+        """Сохранение file_id статического файла"""
+        self.cursor.execute(
+            "INSERT INTO assets (path, sha256, file_id) VALUES (?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET sha256 = excluded.sha256, file_id = excluded.file_id, "
+            "updated_at = CURRENT_TIMESTAMP",
+            (path, sha256, file_id)
+        )
+        self.connection.commit()
+
+    @writes
+    def delete_asset(self, path):
+        """Удаление сохраненного file_id (например, если Telegram его больше не принимает)"""
+        self.cursor.execute("DELETE FROM assets WHERE path = ?", (path,))
+        self.connection.commit()
+
+    def get_fsm_record(self, key):
+        """Состояние FSM: (state, data, updated_at) или None"""
+        cursor = self._read_cursor()
+        cursor.execute("SELECT state, data, updated_at FROM fsm_states WHERE key = ?", (key,))
+        return cursor.fetchone()
+
+    @writes
+    def save_fsm_records(self, records):
+        """Сохранение накопленных состояний FSM одной транзакцией.
+
+        records - список (key, state, data, updated_at); запись без состояния
+        и данных (data == '{}') удаляется.
+        """
+        upserts = [record for record in records if record[1] is not None or record[2] != "{}"]
+        deletes = [(record[0],) for record in records if record[1] is None and record[2] == "{}"]
+        with self.connection:
+            if upserts:
+                self.cursor.executemany(
+                    "INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, "
+                    "updated_at = excluded.updated_at",
+                    upserts
+                )
+            if deletes:
+                self.cursor.executemany("DELETE FROM fsm_states WHERE key = ?", deletes)
+
+    @writes
+    def delete_expired_fsm_records(self, before):
+        """Удаление состояний FSM, не изменявшихся с момента before; возвращает число удаленных"""
+        self.cursor.execute("DELETE FROM fsm_states WHERE updated_at < ?", (before,))
+        self.connection.commit()
+        return self.cursor.rowcount
+
     def close(self):
-        """Закрытие соединения с базой данных"""
+        """Закрытие соединений с базой данных"""
+        with self._readers_lock:
+            for connection in self._readers:
+                connection.close()
+            self._readers.clear()
         self.connection.close()
 
+class AsyncDatabase:
+    """Асинхронная обертка над Database.
+
+    Запросы выполняются вне цикла событий: изменяющие методы - в единственном
+    потоке-писателе, чтение - в небольшом пуле потоков, у каждого из которых
+    свое соединение для чтения. Любой метод Database доступен как корутина
+    с теми же аргументами: await db.get_user_by_telegram_id(...).
+    """
+
+    def __init__(self, database, readers=DB_READERS):
+        self.sync = database
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="database-reader")
+
+    async def run(self, func, *args, **kwargs):
+        """Выполнение произвольной функции в потоке-писателе"""
+        return await self._submit(self._writer, func, *args, **kwargs)
+
+    async def read(self, func, *args, **kwargs):
+        """Выполнение произвольной функции, которая только читает данные, в пуле читателей"""
+        return await self._submit(self._readers, func, *args, **kwargs)
+
+    async def _submit(self, executor, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        pool = "writer" if executor is self._writer else "reader"
+        submitted = time.perf_counter()
+        timings = {}
+
+        def timed():
+            # Время ожидания свободного потока и время самого запроса учитываются отдельно
+            started = time.perf_counter()
+            timings["wait"] = started - submitted
+            DB_QUEUE_WAIT.observe(timings["wait"], pool=pool)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings["query"] = time.perf_counter() - started
+                DB_QUERY_DURATION.observe(timings["query"], method=func.__name__)
+
+        # Поток базы не наследует контекст трассы, поэтому спан открывается на стороне цикла событий
+        with span(f"db.{func.__name__}", **{"db.pool": pool}) as current:
+            try:
+                return await loop.run_in_executor(executor, timed)
+            finally:
+                if current is not None and timings:
+                    current.set_attribute("db.wait_ms", round(timings["wait"] * 1000, 3))
+                    current.set_attribute("db.query_ms", round(timings.get("query", 0) * 1000, 3))
+
+    def __getattr__(self, name):
+        attr = getattr(self.sync, name)
+        if not callable(attr):
+            return attr
+
+        executor = self._writer if getattr(attr, "writes", False) else self._readers
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self._submit(executor, attr, *args, **kwargs)
+
+        # Кэшируем обертку, чтобы не создавать ее при каждом вызове
+        setattr(self, name, method)
+        return method
+
+    async def get_user_by_telegram_id(self, telegram_id):
+        """Пользователь по Telegram ID; при попадании в кэш обходится без обращения к потокам базы"""
+        user = self.sync.user_cache.get(telegram_id)
+        if user is not MISSING:
+            return user
+        return await self._submit(self._readers, self.sync._fetch_user_by_telegram_id, telegram_id)
+
+    async def add_user(self, username, password):
+        """Добавление пользователя; пароль хешируется в пуле password_hasher"""
+        password_hash = await password_hasher.hash(password)
+        return await self._submit(self._writer, self.sync.add_user, username, password_hash)
+
+    async def update_password(self, user_id, new_password):
+        """Изменение пароля пользователя"""
+        password_hash = await password_hasher.hash(new_password)
+        return await self._submit(self._writer, self.sync.update_password, user_id, password_hash)
+
+    async def import_users(self, users, progress=None, batch_size=IMPORT_BATCH_SIZE):
+        """Массовое добавление пользователей (username, password, link).
+
+        Занятые логины отсеиваются до хеширования. Пароли остальных хешируются
+        пачками по batch_size в пуле password_hasher, каждая пачка записывается
+        своей транзакцией: в пуле не копятся тысячи ожидающих хешей, а прерванный
+        импорт сохраняет уже записанные пачки. Хеш scrypt стоит десятки
+        миллисекунд CPU, поэтому импорт идет примерно со скоростью 20 строк
+        в секунду на ядро (10 тысяч строк - минуты).
+
+        progress - необязательная корутина progress(done, total), вызывается после
+        каждой пачки. Возвращает множество логинов, не добавленных из-за конфликта.
+        """
+        existing = await self._submit(self._readers, self.sync.get_existing_usernames,
+                                      [username for username, _, _ in users])
+        users = [user for user in users if user[0] not in existing]
+        conflicts = set(existing)
+        for start in range(0, len(users), batch_size):
+            batch = users[start:start + batch_size]
+            hashes = await asyncio.gather(*(password_hasher.hash(password) for _, password, _ in batch))
+            rows = [(username, password_hash, link) for (username, _, link), password_hash in zip(batch, hashes)]
+            conflicts |= await self._submit(self._writer, self.sync.insert_users, rows)
+            if progress:
+                await progress(start + len(batch), len(users))
+        return conflicts
+
+    async def authenticate_user(self, username, password):
+        """Проверка учетных данных, возвращает id пользователя или None.
+
+        Пароли, сохраненные открытым текстом или со старыми параметрами scrypt,
+        после успешного входа перехешируются.
+        """
+        row = await self._submit(self._readers, self.sync.get_password_hash, username)
+        if not row:
+            return None
+        user_id, stored = row
+        if not await password_hasher.verify(password, stored):
+            return None
+        if needs_rehash(stored):
+            new_hash = await password_hasher.hash(password)
+            await self._submit(self._writer, self.sync.replace_password_hash, user_id, stored, new_hash)
+        return user_id
+
+    async def close(self):
+        """Закрытие соединения и остановка потока базы данных"""
+        self._readers.shutdown(wait=True)
+        await self.run(self.sync.close)
+        self._writer.shutdown(wait=True)
+
 # Создаем глобальный экземпляр базы данных для использования во всем приложении
-db = Database()
+db = AsyncDatabase(Database())
+
+registry.register(Gauge(
+    "bot_user_cache_size", "Entries in the telegram_id -> user cache",
+    lambda: len(db.sync.user_cache)
+))
+registry.register(CallbackCounter(
+    "bot_user_cache_requests_total", "User cache lookups by result",
+    lambda: {("hit",): db.sync.user_cache.hits, ("miss",): db.sync.user_cache.misses},
+    ("result",)
+))
@@ -1,34 +1,62 @@
 from aiogram import Router, F, Bot, Dispatcher
-from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, FSInputFile
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramAPIError
 from aiogram.fsm.context import FSMContext
-from config import get_welcome_message, update_welcome_message
+from config import ADMIN_IDS
 from models import BroadcastByIdStates, ChannelStates
 from database import db
-from models import AddUserStates, EditUserStates, DeleteUserStates, BroadcastStates, WelcomeMessageStates
+from models import AddUserStates, EditUserStates, DeleteUserStates, BroadcastStates, WelcomeMessageStates, ImportUsersStates
 from utils.keyboards import (
     get_admin_keyboard, 
     get_user_action_keyboard, 
     get_cancel_keyboard,
     get_admin_inline_keyboard,
     get_main_keyboard,
-    get_start_keyboard
+    get_start_keyboard,
+    get_broadcast_job_keyboard,
+    get_user_browser_keyboard,
+    get_delete_user_confirm_keyboard
 )
 from utils.helpers import (
     check_admin,
     cancel_state,
-    format_user_list,
+    write_user_list,
+    answer_long_text,
+    EMPTY_USER_LIST,
+    REPORT_MAX_MESSAGES,
     send_error_message,
     send_success_message
 )
+from utils.broadcast import broadcast_worker, extract_broadcast_payload, format_broadcast_job
+from utils.welcome import welcome_store, is_valid_telegram_html
+from utils.users_csv import IMPORT_COLUMNS, parse_users_csv, write_users_csv
 
 import asyncio
+import config
 import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from io import BytesIO
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+# Количество пользователей на одной странице списка выбора
+USER_PAGE_SIZE = getattr(config, "USER_PAGE_SIZE", 10)
+# Bot API не отдает ботам файлы больше 20 МБ
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024
+# Сколько проблемных строк импорта перечислять в отчете
+IMPORT_REPORT_LINES = 50
+# Как часто обновлять сообщение с прогрессом импорта (секунды)
+IMPORT_PROGRESS_INTERVAL = getattr(config, "IMPORT_PROGRESS_INTERVAL", 5.0)
+
+# Импорты, выполняющиеся в фоне; останавливаются в bot.on_shutdown
+import_tasks = set()
+
 @router.message(F.text == "📋 Канал для ссылок")
 async def cmd_set_links_channel(message: Message, state: FSMContext):
     """Обработчик команды установки канала для ссылок"""
@@ -77,7 +105,7 @@ async def process_channel_id(message: Message, state: FSMContext, bot: Bot):
         await test_message.delete()
 
         # Сохраняем ID канала в базе данных
-        if db.set_channel(channel_type, channel_id):
+        if await db.set_channel(channel_type, channel_id):
             channel_type_text = "ссылок" if channel_type == "links" else "сообщений"
             await send_success_message(
                 message,
@@ -107,6 +135,46 @@ async def process_channel_id(message: Message, state: FSMContext, bot: Bot):
 # (разместите их перед функцией setup(dp))
 
 
+async def send_user_browser(message: Message, action: str, prompt: str):
+    """Отправка первой страницы списка пользователей для выбора.
+
+    Возвращает False, если пользователей нет.
+    """
+    users, has_prev, has_next = await db.get_users_page(limit=USER_PAGE_SIZE)
+    if not users:
+        await send_error_message(message, "Список пользователей пуст.", reply_markup=get_admin_keyboard())
+        return False
+    
+    await message.answer(prompt, reply_markup=get_cancel_keyboard())
+    await message.answer(
+        "📋 Список пользователей:",
+        reply_markup=get_user_browser_keyboard(action, users, has_prev, has_next)
+    )
+    return True
+
+async def parse_user_id(message: Message):
+    """Разбор введенного вручную ID пользователя"""
+    try:
+        return int(message.text.strip())
+    except (ValueError, AttributeError):
+        await send_error_message(
+            message, 
+            "Пожалуйста, введите корректный числовой ID пользователя.",
+            reply_markup=get_cancel_keyboard()
+        )
+        return None
+
+def parse_callback_data(data, size):
+    """Разбор callback_data вида "префикс:...:число"; None, если данные повреждены"""
+    parts = (data or "").split(":")
+    if len(parts) != size:
+        return None
+    try:
+        parts[-1] = int(parts[-1])
+    except ValueError:
+        return None
+    return parts
+
 @router.message(F.text == "📩 Сообщение")
 @router.message(Command("broadcast_by_id"))
 async def cmd_broadcast_by_id(message: Message, state: FSMContext):
@@ -114,26 +182,12 @@ async def cmd_broadcast_by_id(message: Message, state: FSMContext):
     if not await check_admin(message):
         return
     
-    # Получаем список всех пользователей
-    users = db.get_all_users()
-    if not users:
-        await send_error_message(message, "Список пользователей пуст.", reply_markup=get_admin_keyboard())
-        return
-    
-    # Формируем список пользователей с их ID
-    user_list = "📋 Список пользователей:\n\n"
-    for user_id, username, telegram_id, link in users:
-        user_list += f"👤 ID: {user_id} | Логин: {username}"
-        if telegram_id:
-            user_list += f" | ✅ Авторизован (TG ID: {telegram_id})"
-        else:
-            user_list += " | ❌ Не авторизован"
-        user_list += "\n"
-    
-    user_list += "\nВведите ID пользователя, которому хотите отправить сообщение:"
-    
-    await message.answer(user_list, reply_markup=get_cancel_keyboard())
-    await state.set_state(BroadcastByIdStates.waiting_for_user_id)
+    if await send_user_browser(
+        message,
+        "message",
+        "Выберите пользователя, которому хотите отправить сообщение, или введите его ID:"
+    ):
+        await state.set_state(BroadcastByIdStates.waiting_for_user_id)
 
 
 @router.message(BroadcastByIdStates.waiting_for_user_id)
@@ -142,18 +196,14 @@ async def process_user_id_for_broadcast(message: Message, state: FSMContext):
     if await cancel_state(message, state):
         return
     
-    try:
-        user_id = int(message.text.strip())
-    except ValueError:
-        await send_error_message(
-            message, 
-            "Пожалуйста, введите корректный числовой ID пользователя.",
-            reply_markup=get_cancel_keyboard()
-        )
-        return
-    
+    user_id = await parse_user_id(message)
+    if user_id is not None:
+        await select_user_for_broadcast(message, state, user_id)
+
+async def select_user_for_broadcast(message: Message, state: FSMContext, user_id: int):
+    """Выбор получателя сообщения по ID"""
     # Проверяем существование пользователя с указанным ID
-    user = db.get_user_by_id(user_id)
+    user = await db.get_user_by_id(user_id)
     if not user:
         await send_error_message(
             message, 
@@ -230,25 +280,8 @@ async def cmd_edit_user(message: Message, state: FSMContext):
     if not await check_admin(message):
         return
     
-    users = db.get_all_users()
-    if not users:
-        await send_error_message(message, "Список пользователей пуст.", reply_markup=get_admin_keyboard())
-        return
-    
-    # Формируем список пользователей
-    user_list = "📋 Список пользователей:\n\n"
-    for user_id, username, telegram_id, link in users:
-        user_list += f"👤 ID: {user_id} | Логин: {username}"
-        if telegram_id:
-            user_list += " | ✅ Авторизован"
-        else:
-            user_list += " | ❌ Не авторизован"
-        user_list += "\n"
-    
-    user_list += "\nВведите ID пользователя для изменения:"
-    
-    await message.answer(user_list, reply_markup=get_cancel_keyboard())
-    await state.set_state(EditUserStates.waiting_for_user_id)
+    if await send_user_browser(message, "edit", "Выберите пользователя для изменения или введите его ID:"):
+        await state.set_state(EditUserStates.waiting_for_user_id)
 
 @router.message(EditUserStates.waiting_for_user_id)
 async def process_edit_user_id(message: Message, state: FSMContext):
@@ -256,18 +289,14 @@ async def process_edit_user_id(message: Message, state: FSMContext):
     if await cancel_state(message, state):
         return
     
-    try:
-        user_id = int(message.text.strip())
-    except ValueError:
-        await send_error_message(
-            message, 
-            "Пожалуйста, введите корректный числовой ID пользователя.",
-            reply_markup=get_cancel_keyboard()
-        )
-        return
-    
+    user_id = await parse_user_id(message)
+    if user_id is not None:
+        await select_user_for_edit(message, state, user_id)
+
+async def select_user_for_edit(message: Message, state: FSMContext, user_id: int):
+    """Выбор пользователя для изменения по ID"""
     # Проверяем существование пользователя
-    user = db.get_user_by_id(user_id)
+    user = await db.get_user_by_id(user_id)
     if not user:
         await send_error_message(
             message, 
@@ -326,7 +355,7 @@ async def process_new_username_edit(message: Message, state: FSMContext):
     user_id = user_data.get('user_id')
     
     # Проверяем, не занят ли новый логин
-    existing_user = db.get_user_by_username(new_username)
+    existing_user = await db.get_user_by_username(new_username)
     if existing_user and existing_user[0] != user_id:  # existing_user[0] - это ID
         await send_error_message(
             message, 
@@ -337,7 +366,7 @@ async def process_new_username_edit(message: Message, state: FSMContext):
         return
     
     # Обновляем логин
-    if db.update_username(user_id, new_username):
+    if await db.update_username(user_id, new_username):
         await send_success_message(
             message, 
             f"Логин пользователя (ID: {user_id}) успешно изменен на '{new_username}'",
@@ -363,7 +392,7 @@ async def process_new_password_edit(message: Message, state: FSMContext):
     user_id = user_data.get('user_id')
     
     # Обновляем пароль
-    if db.update_password(user_id, new_password):
+    if await db.update_password(user_id, new_password):
         await send_success_message(
             message, 
             f"Пароль пользователя (ID: {user_id}) успешно изменен на '{new_password}'",
@@ -385,25 +414,8 @@ async def cmd_delete_user(message: Message, state: FSMContext):
     if not await check_admin(message):
         return
     
-    users = db.get_all_users()
-    if not users:
-        await send_error_message(message, "Список пользователей пуст.", reply_markup=get_admin_keyboard())
-        return
-    
-    # Формируем список пользователей
-    user_list = "📋 Список пользователей:\n\n"
-    for user_id, username, telegram_id, link in users:
-        user_list += f"👤 ID: {user_id} | Логин: {username}"
-        if telegram_id:
-            user_list += " | ✅ Авторизован"
-        else:
-            user_list += " | ❌ Не авторизован"
-        user_list += "\n"
-    
-    user_list += "\nВведите ID пользователя для удаления:"
-    
-    await message.answer(user_list, reply_markup=get_cancel_keyboard())
-    await state.set_state(DeleteUserStates.waiting_for_user_id)
+    if await send_user_browser(message, "delete", "Выберите пользователя для удаления или введите его ID:"):
+        await state.set_state(DeleteUserStates.waiting_for_user_id)
 
 @router.message(DeleteUserStates.waiting_for_user_id)
 async def process_delete_user_id(message: Message, state: FSMContext):
@@ -411,18 +423,69 @@ async def process_delete_user_id(message: Message, state: FSMContext):
     if await cancel_state(message, state):
         return
     
-    try:
-        user_id = int(message.text.strip())
-    except ValueError:
+    user_id = await parse_user_id(message)
+    if user_id is not None:
+        await select_user_for_delete(message, state, user_id)
+
+async def select_user_for_delete(message: Message, state: FSMContext, user_id: int):
+    """Запрос подтверждения удаления пользователя по ID"""
+    # Проверяем существование пользователя
+    user = await db.get_user_by_id(user_id)
+    if not user:
         await send_error_message(
             message, 
-            "Пожалуйста, введите корректный числовой ID пользователя.",
-            reply_markup=get_cancel_keyboard()
+            f"Пользователь с ID {user_id} не найден.",
+            reply_markup=get_admin_keyboard()
         )
+        await state.clear()
         return
     
-    # Проверяем существование пользователя
-    user = db.get_user_by_id(user_id)
+    # Удаление необратимо, поэтому случайное нажатие в списке не должно к нему приводить
+    await state.update_data(user_id=user_id)
+    await state.set_state(DeleteUserStates.waiting_for_confirmation)
+    await message.answer(
+        f"Удалить пользователя '{user[0]}' (ID: {user_id})? Это действие нельзя отменить.",
+        reply_markup=get_delete_user_confirm_keyboard(user_id)
+    )
+
+@router.message(DeleteUserStates.waiting_for_confirmation)
+async def process_delete_confirmation_message(message: Message, state: FSMContext):
+    """Сообщение вместо нажатия кнопки подтверждения удаления"""
+    if await cancel_state(message, state):
+        return
+    
+    await message.answer("Подтвердите или отмените удаление кнопкой под сообщением выше.")
+
+@router.callback_query(F.data.startswith("du:"))
+async def callback_delete_user(callback: CallbackQuery, state: FSMContext):
+    """Подтверждение или отмена удаления пользователя"""
+    if callback.from_user.id not in ADMIN_IDS:
+        await callback.answer("❌ У вас нет доступа к этой команде.")
+        return
+    
+    parsed = parse_callback_data(callback.data, 3)
+    if not parsed or parsed[1] not in ("confirm", "cancel"):
+        await callback.answer("❌ Некорректная кнопка, начните действие заново.")
+        return
+    _, op, user_id = parsed
+    
+    # Кнопка должна относиться к текущему диалогу удаления именно этого пользователя
+    data = await state.get_data()
+    if await state.get_state() != DeleteUserStates.waiting_for_confirmation.state or data.get("user_id") != user_id:
+        await callback.answer("Запрос устарел, начните действие заново.")
+        return
+    
+    await callback.answer()
+    await callback.message.edit_reply_markup(reply_markup=None)
+    if op != "confirm":
+        await state.clear()
+        await callback.message.answer("Удаление отменено.", reply_markup=get_admin_keyboard())
+        return
+    await delete_user(callback.message, state, user_id)
+
+async def delete_user(message: Message, state: FSMContext, user_id: int):
+    """Удаление пользователя после подтверждения"""
+    user = await db.get_user_by_id(user_id)
     if not user:
         await send_error_message(
             message, 
@@ -435,7 +498,7 @@ async def process_delete_user_id(message: Message, state: FSMContext):
     username = user[0]
     
     # Удаляем пользователя
-    if db.delete_user(user_id):
+    if await db.delete_user(user_id):
         await send_success_message(
             message, 
             f"Пользователь '{username}' (ID: {user_id}) успешно удален",
@@ -450,6 +513,48 @@ async def process_delete_user_id(message: Message, state: FSMContext):
     
     await state.clear()
 
+USER_BROWSER_ACTIONS = {
+    "edit": (EditUserStates.waiting_for_user_id, select_user_for_edit),
+    "delete": (DeleteUserStates.waiting_for_user_id, select_user_for_delete),
+    "message": (BroadcastByIdStates.waiting_for_user_id, select_user_for_broadcast),
+}
+
+@router.callback_query(F.data.startswith("ub:"))
+async def callback_user_browser(callback: CallbackQuery, state: FSMContext):
+    """Листание списка пользователей и выбор пользователя кнопкой"""
+    if callback.from_user.id not in ADMIN_IDS:
+        await callback.answer("❌ У вас нет доступа к этой команде.")
+        return
+    
+    parsed = parse_callback_data(callback.data, 4)
+    if not parsed or parsed[1] not in USER_BROWSER_ACTIONS or parsed[2] not in ("pick", "next", "prev"):
+        await callback.answer("❌ Некорректная кнопка, начните действие заново.")
+        return
+    _, action, op, user_id = parsed
+    expected_state, select = USER_BROWSER_ACTIONS[action]
+    
+    # Кнопки из устаревшего списка не должны срабатывать после завершения диалога
+    if await state.get_state() != expected_state.state:
+        await callback.answer("Список устарел, начните действие заново.")
+        return
+    
+    if op == "pick":
+        await callback.answer()
+        await callback.message.edit_reply_markup(reply_markup=None)
+        await select(callback.message, state, user_id)
+        return
+    
+    if op == "next":
+        users, has_prev, has_next = await db.get_users_page(after_id=user_id, limit=USER_PAGE_SIZE)
+    else:
+        users, has_prev, has_next = await db.get_users_page(before_id=user_id, limit=USER_PAGE_SIZE)
+    
+    await callback.answer()
+    if users:
+        await callback.message.edit_reply_markup(
+            reply_markup=get_user_browser_keyboard(action, users, has_prev, has_next)
+        )
+
 # Массовая рассылка всем пользователям
 @router.message(F.text == "📢 Рассылка")
 @router.message(Command("broadcast"))
@@ -472,158 +577,107 @@ async def process_broadcast_content(message: Message, state: FSMContext, bot: Bo
     if await cancel_state(message, state):
         return
     
-    users = db.get_all_users()
-    sent_count = 0
-    failed_count = 0
-    
-    progress_msg = await message.answer("⏳ Начинаю рассылку...")
-    
-    for user_id, username, telegram_id, _ in users:
-        if telegram_id and telegram_id != message.from_user.id:  # Пропускаем отправителя
-            try:
-                success = False
-                
-                # Текстовое сообщение
-                if message.text and not message.media_group_id:
-                    text = message.text.strip()
-                    formatted_message = f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{text}"
-                    await bot.send_message(
-                        telegram_id,
-                        formatted_message,
-                        parse_mode="HTML"
-                    )
-                    success = True
-                
-                # Фото
-                elif message.photo:
-                    photo = message.photo[-1]
-                    caption = message.caption or "<b>Сообщение от PARTNERS 🔗</b>"
-                    formatted_caption = f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{caption}" if message.caption else caption
-                    
-                    await bot.send_photo(
-                        telegram_id,
-                        photo=photo.file_id,
-                        caption=formatted_caption,
-                        parse_mode="HTML"
-                    )
-                    success = True
-                
-                # Видео
-                elif message.video:
-                    caption = message.caption or "<b>Сообщение от PARTNERS 🔗</b>"
-                    formatted_caption = f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{caption}" if message.caption else caption
-                    
-                    await bot.send_video(
-                        telegram_id,
-                        video=message.video.file_id,
-                        caption=formatted_caption,
-                        parse_mode="HTML"
-                    )
-                    success = True
-                
-                # Аудио
-                elif message.audio:
-                    caption = message.caption or "<b>Сообщение от PARTNERS 🔗</b>"
-                    formatted_caption = f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{caption}" if message.caption else caption
-                    
-                    await bot.send_audio(
-                        telegram_id,
-                        audio=message.audio.file_id,
-                        caption=formatted_caption,
-                        parse_mode="HTML"
-                    )
-                    success = True
-                
-                # Документ
-                elif message.document:
-                    caption = message.caption or "<b>Сообщение от PARTNERS 🔗</b>"
-                    formatted_caption = f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{caption}" if message.caption else caption
-                    
-                    await bot.send_document(
-                        telegram_id,
-                        document=message.document.file_id,
-                        caption=formatted_caption,
-                        parse_mode="HTML"
-                    )
-                    success = True
-                
-                # Голосовое сообщение
-                elif message.voice:
-                    caption = message.caption or "<b>Сообщение от PARTNERS 🔗</b>"
-                    formatted_caption = f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{caption}" if message.caption else caption
-                    
-                    await bot.send_voice(
-                        telegram_id,
-                        voice=message.voice.file_id,
-                        caption=formatted_caption,
-                        parse_mode="HTML"
-                    )
-                    success = True
-                
-                # Стикер
-                elif message.sticker:
-                    await bot.send_sticker(
-                        telegram_id,
-                        sticker=message.sticker.file_id
-                    )
-                    success = True
-                
-                # Анимация (GIF)
-                elif message.animation:
-                    caption = message.caption or "<b>Сообщение от PARTNERS 🔗</b>"
-                    formatted_caption = f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{caption}" if message.caption else caption
-                    
-                    await bot.send_animation(
-                        telegram_id,
-                        animation=message.animation.file_id,
-                        caption=formatted_caption,
-                        parse_mode="HTML"
-                    )
-                    success = True
-                
-                if success:
-                    sent_count += 1
-                else:
-                    failed_count += 1
-                
-                if sent_count % 10 == 0:
-                    await progress_msg.edit_text(f"⏳ Отправлено: {sent_count} сообщений...")
-                
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Failed to send message to user {username} (ID: {user_id}): {e}")
-    
-    result_message = f"Рассылка завершена!\n\n📊 Статистика:\n- Отправлено: {sent_count}\n- Не доставлено: {failed_count}"
-    await send_success_message(message, result_message)
+    payload = extract_broadcast_payload(message)
+    if not payload:
+        await send_error_message(
+            message,
+            "Этот тип контента не поддерживается для рассылки.",
+            reply_markup=get_admin_keyboard()
+        )
+        await state.clear()
+        return
+    
+    # Рассылка сохраняется в базе и выполняется в фоне, поэтому переживает перезапуск бота
+    job_id = await broadcast_worker.create_job(message.from_user.id, payload)
+    progress_msg = await message.answer(
+        "⏳ Начинаю рассылку...",
+        reply_markup=get_broadcast_job_keyboard(job_id, "running")
+    )
+    await db.set_broadcast_progress_message(job_id, progress_msg.chat.id, progress_msg.message_id)
+    broadcast_worker.submit(job_id, bot)
+    
     await message.answer("Выберите действие:", reply_markup=get_admin_keyboard())
     await state.clear()
 
-async def check_admin_and_get_users(message: Message) -> list:
-    """Проверка админа и получение списка пользователей"""
+@router.message(F.text == "📊 Рассылки")
+@router.message(Command("broadcasts"))
+async def cmd_broadcasts(message: Message):
+    """Список активных и приостановленных рассылок"""
     if not await check_admin(message):
-        return None
-        
-    users = db.get_all_users()
-    if not users:
-        await send_error_message(message, "Список пользователей пуст.", reply_markup=get_admin_keyboard())
-        return None
-    return users
+        return
+    
+    jobs = await db.get_broadcast_jobs(("running", "paused"))
+    if not jobs:
+        await message.answer("Нет активных рассылок.", reply_markup=get_admin_keyboard())
+        return
+    
+    for job_id, status, total, sent, failed, blocked in jobs:
+        await message.answer(
+            format_broadcast_job(job_id, status, total, sent, failed, blocked),
+            reply_markup=get_broadcast_job_keyboard(job_id, status)
+        )
+
+@router.callback_query(F.data.startswith("bc:"))
+async def callback_broadcast_control(callback: CallbackQuery, bot: Bot):
+    """Пауза, возобновление и отмена рассылки"""
+    if callback.from_user.id not in ADMIN_IDS:
+        await callback.answer("❌ У вас нет доступа к этой команде.")
+        return
+    
+    _, action, job_id = callback.data.split(":")
+    job_id = int(job_id)
+    if action == "pause":
+        changed, text = await broadcast_worker.pause(job_id), "Рассылка будет приостановлена"
+    elif action == "resume":
+        changed, text = await broadcast_worker.resume(job_id, bot), "Рассылка возобновлена"
+    else:
+        changed, text = await broadcast_worker.cancel(job_id), "Рассылка отменена"
+    
+    if not changed:
+        await callback.answer("Действие недоступно для этой рассылки.")
+        return
+    
+    await callback.answer(text)
+    _, _, _, status, _, total, sent, failed, blocked, *_ = await db.get_broadcast_job(job_id)
+    await callback.message.edit_text(
+        format_broadcast_job(job_id, status, total, sent, failed, blocked),
+        reply_markup=get_broadcast_job_keyboard(job_id, status)
+    )
+
+def write_user_report(path):
+    """Отчет "👥 Пользователи" в текстовый файл; выполняется в потоке чтения базы"""
+    with open(path, "w", encoding="utf-8") as file:
+        return write_user_list(db.sync.iter_user_report(), file)
 
 @router.message(F.text == "👥 Пользователи")
 @router.message(Command("admin"))
 async def cmd_admin(message: Message):
     """Обработчик команды /admin"""
-    users = await check_admin_and_get_users(message)
-    if not users:
+    if not await check_admin(message):
         return
     
-    report = format_user_list(users)
-    if users:
-        report += "\nДля добавления нового пользователя используйте команду /adduser"
-    
-    await message.answer(report)
+    # Отчет пишется в файл одним запросом в потоке чтения базы данных;
+    # небольшой отправляется сообщениями, большой - документом
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    os.close(fd)
+    try:
+        count = await db.read(write_user_report, path)
+        if not count:
+            await send_error_message(message, EMPTY_USER_LIST, reply_markup=get_admin_keyboard())
+            return
+        
+        footer = "\nДля добавления нового пользователя используйте команду /adduser"
+        if os.path.getsize(path) <= REPORT_MAX_MESSAGES * 4096:
+            with open(path, encoding="utf-8") as file:
+                await answer_long_text(message, file.read() + footer, "users.txt")
+        else:
+            filename = f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            await message.answer_document(
+                FSInputFile(path, filename=filename),
+                caption=f"📊 Пользователей: {count}\n{footer}"
+            )
+    finally:
+        os.remove(path)
     await message.answer(
         "Функции администрирования:",
         reply_markup=get_admin_keyboard()
@@ -646,7 +700,7 @@ async def process_new_username(message: Message, state: FSMContext):
         return
     
     username = message.text.strip()
-    if db.get_user_by_username(username):
+    if await db.get_user_by_username(username):
         await send_error_message(message, f"Пользователь с логином '{username}' уже существует. Попробуйте другой логин.")
         return
     
@@ -664,7 +718,7 @@ async def process_new_password(message: Message, state: FSMContext):
     user_data = await state.get_data()
     username = user_data.get('username')
     
-    if db.add_user(username, password):
+    if await db.add_user(username, password):
         await send_success_message(
             message,
             f"Пользователь '{username}' успешно создан!\n\nЛогин: {username}\nПароль: {password}"
@@ -679,6 +733,129 @@ async def process_new_password(message: Message, state: FSMContext):
     
     await state.clear()
 
+@router.message(F.text == "📥 Импорт")
+@router.message(Command("import_users"))
+async def cmd_import_users(message: Message, state: FSMContext):
+    """Обработчик команды /import_users"""
+    if not await check_admin(message):
+        return
+    
+    await message.answer(
+        f"Отправьте CSV-файл с колонками: {', '.join(IMPORT_COLUMNS)}.\n"
+        f"Колонка link необязательна, разделитель - запятая или точка с запятой.\n"
+        f"Импорт идет в фоне: пароли хешируются со скоростью около 20 строк в секунду "
+        f"на ядро процессора, файл на 10 тысяч строк займет несколько минут.",
+        reply_markup=get_cancel_keyboard()
+    )
+    await state.set_state(ImportUsersStates.waiting_for_file)
+
+@router.message(ImportUsersStates.waiting_for_file)
+async def process_import_file(message: Message, state: FSMContext, bot: Bot):
+    """Импорт пользователей из CSV-файла"""
+    if await cancel_state(message, state):
+        return
+    
+    document = message.document
+    if not document:
+        await send_error_message(message, "Отправьте CSV-файл документом.")
+        return
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await send_error_message(message, "Файл больше 20 МБ.")
+        return
+    
+    data = (await bot.download(document, destination=BytesIO())).getvalue()
+    users, errors = parse_users_csv(data)
+    if not users:
+        await send_error_message(message, "В файле нет пользователей для импорта.", reply_markup=get_admin_keyboard())
+        await state.clear()
+        return
+    
+    # Хеширование паролей занимает минуты на больших файлах, поэтому импорт идет в фоне,
+    # а админ может продолжать работу с ботом
+    status = await message.answer(f"⏳ Импорт {len(users)} пользователей запущен, о завершении придет сообщение.")
+    await message.answer("Выберите действие:", reply_markup=get_admin_keyboard())
+    await state.clear()
+    task = asyncio.create_task(run_import(message, status, users, errors))
+    import_tasks.add(task)
+    task.add_done_callback(import_tasks.discard)
+
+async def run_import(message: Message, status: Message, users, errors):
+    """Импорт разобранных строк CSV с обновлением сообщения о прогрессе и итоговым отчетом"""
+    last_update = time.monotonic()
+    
+    async def progress(done, total):
+        nonlocal last_update
+        if time.monotonic() - last_update < IMPORT_PROGRESS_INTERVAL:
+            return
+        last_update = time.monotonic()
+        try:
+            await status.edit_text(f"⏳ Импорт: обработано {done} из {total} новых пользователей...")
+        except TelegramAPIError as e:
+            logger.debug(f"Failed to update import progress message: {e}")
+    
+    lines = {username: line_number for line_number, username, _, _ in users}
+    try:
+        conflicts = await db.import_users(
+            [(username, password, link) for _, username, password, link in users], progress
+        )
+    except Exception as e:
+        logger.error(f"User import failed: {e}")
+        await send_error_message(
+            message,
+            "Импорт прерван из-за ошибки. Уже добавленные пользователи сохранены, "
+            "при повторном импорте они будут пропущены.",
+            reply_markup=get_admin_keyboard()
+        )
+        return
+    errors.extend((lines[username], f"логин {username} уже существует") for username in conflicts)
+    errors.sort()
+    
+    report = (
+        f"✅ Импорт завершен\n"
+        f"Добавлено: {len(users) - len(conflicts)}\n"
+        f"Пропущено строк: {len(errors)}"
+    )
+    if errors:
+        report += "\n\n" + "\n".join(
+            f"Строка {line_number}: {reason}" for line_number, reason in errors[:IMPORT_REPORT_LINES]
+        )
+        if len(errors) > IMPORT_REPORT_LINES:
+            report += f"\n... и еще {len(errors) - IMPORT_REPORT_LINES}"
+    await answer_long_text(message, report, "import_report.txt", caption="✅ Импорт завершен")
+
+async def stop_imports():
+    """Прерывание фоновых импортов; записанные пачки остаются в базе"""
+    tasks = list(import_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def write_users_export(path):
+    """Выгрузка всех пользователей в CSV-файл; выполняется в потоке чтения базы"""
+    with open(path, "w", newline="", encoding="utf-8-sig") as file:
+        return write_users_csv(db.sync.iter_user_report(), file)
+
+@router.message(F.text == "📤 Экспорт")
+@router.message(Command("export_users"))
+async def cmd_export_users(message: Message):
+    """Обработчик команды /export_users"""
+    if not await check_admin(message):
+        return
+    
+    # Файл пишется построчно, весь список пользователей в памяти не держится
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        count = await db.read(write_users_export, path)
+        filename = f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        await message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=f"📤 Пользователей: {count}",
+            reply_markup=get_admin_keyboard()
+        )
+    finally:
+        os.remove(path)
+
 @router.message(F.text == "✏️ Изменить приветствие")
 @router.message(Command("edit_welcome"))
 async def cmd_edit_welcome(message: Message, state: FSMContext):
@@ -687,8 +864,9 @@ async def cmd_edit_welcome(message: Message, state: FSMContext):
         return
     
     # Показываем текущее сообщение и инструкции
+    welcome = await welcome_store.get()
     await message.answer(
-        f"Текущее приветственное сообщение:\n\n{get_welcome_message()}\n\n"
+        f"Текущее приветственное сообщение:\n\n{welcome.text}\n\n"
         f"Введите новый текст приветственного сообщения. Можно использовать HTML-разметку:\n"
         f"• Гиперссылка: <a href='https://example.com'>текст</a>\n"
         f"• Жирный текст: <b>текст</b>\n"
@@ -711,6 +889,16 @@ async def process_welcome_message(message: Message, state: FSMContext):
         await state.clear()
         return
     
+    # Сначала проверяем разметку локально, без обращения к Telegram
+    if not is_valid_telegram_html(new_welcome_message):
+        await send_error_message(
+            message,
+            "Ошибка в HTML-разметке. Проверьте правильность тегов.",
+            reply_markup=get_admin_keyboard()
+        )
+        await state.clear()
+        return
+    
     # Обновляем приветственное сообщение
     try:
         # Проверяем, что сообщение корректно отображается с HTML
@@ -720,15 +908,9 @@ async def process_welcome_message(message: Message, state: FSMContext):
         )
         await test_msg.delete()
         
-        # Если HTML валидный, обновляем сообщение
-        if update_welcome_message(new_welcome_message):
-            await send_success_message(message, "Приветственное сообщение успешно обновлено!")
-        else:
-            await send_error_message(
-                message,
-                "Не удалось обновить приветственное сообщение",
-                reply_markup=get_admin_keyboard()
-            )
+        # Если HTML валидный, сохраняем новую версию, кэш обновляется сразу
+        welcome = await welcome_store.update(new_welcome_message, message.from_user.id)
+        await send_success_message(message, f"Приветственное сообщение успешно обновлено (версия {welcome.version})!")
             
     except Exception as e:
         logger.error(f"Failed to validate HTML in welcome message: {e}")
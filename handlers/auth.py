@@ -1,20 +1,22 @@
 from aiogram import Router, F, Bot, Dispatcher, types
-from aiogram.types import Message, BufferedInputFile, ReplyKeyboardRemove, FSInputFile, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import Message, BufferedInputFile, ReplyKeyboardRemove, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
 from io import BytesIO
-import os
 import logging
 
 logger = logging.getLogger(__name__)
 
-from datetime import datetime
 from database import db
 from models import AuthStates, RegistrationStates
-from config import ADMIN_IDS, BOT_NAME, get_welcome_message
+from config import ADMIN_IDS, BOT_NAME
 from utils.keyboards import get_start_keyboard, get_main_keyboard, get_admin_keyboard, get_admin_inline_keyboard, get_auth_keyboard
-from utils.captcha import generate_captcha_text, generate_captcha_image
+from utils.assets import asset_registry, LOGO_PATH
+from utils.welcome import welcome_store
+from utils.captcha import CAPTCHA_FILENAME
+from utils.captcha_pool import captcha_pool
 from utils.helpers import send_error_message, send_success_message, cancel_state
+from utils.notifications import admin_notifier
 
 # Создаем роутер для аутентификации
 router = Router()
@@ -26,6 +28,26 @@ def get_start_button():
     ]
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
+async def send_welcome(message: Message):
+    """Отправка приветственного сообщения с логотипом.
+
+    Логотип загружается в Telegram один раз, дальше отправляется по file_id.
+    """
+    welcome = await welcome_store.get()
+    try:
+        sent = await asset_registry.answer_photo(
+            message,
+            LOGO_PATH,
+            caption=welcome.text,
+            parse_mode=welcome.parse_mode
+        )
+        if not sent:
+            await message.answer(welcome.text, parse_mode=welcome.parse_mode)
+    except Exception as e:
+        logger.error(f"Error sending welcome message: {e}")
+        if not await asset_registry.answer_photo(message, LOGO_PATH, caption=welcome.text, parse_mode=None):
+            await message.answer(welcome.text, parse_mode=None)
+
 @router.message(CommandStart())
 @router.callback_query(F.data == "start_bot")
 async def cmd_start(event: Message | types.CallbackQuery, state: FSMContext):
@@ -44,7 +66,7 @@ async def cmd_start(event: Message | types.CallbackQuery, state: FSMContext):
         user_id = message.from_user.id
     
     # Проверяем, авторизован ли пользователь
-    user = db.get_user_by_telegram_id(user_id)
+    user = await db.get_user_by_telegram_id(user_id)
     
     if user:  # Если пользователь уже авторизован
         is_admin = user_id in ADMIN_IDS
@@ -73,9 +95,8 @@ async def cmd_start(event: Message | types.CallbackQuery, state: FSMContext):
         return  # Завершаем обработку для авторизованных пользователей
     
     # Для неавторизованных пользователей сразу показываем капчу
-    # Генерация капчи
-    captcha_text = generate_captcha_text()
-    captcha_image = generate_captcha_image(captcha_text)
+    # Капча берется из заранее заполненного пула, рисование не блокирует бота
+    captcha_text, captcha_image = await captcha_pool.get()
     
     await state.update_data(captcha_text=captcha_text)
     
@@ -86,7 +107,7 @@ async def cmd_start(event: Message | types.CallbackQuery, state: FSMContext):
     
     # В aiogram 3.x для отправки байтов используем BufferedInputFile вместо FSInputFile
     await message.answer_photo(
-        BufferedInputFile(captcha_image, filename="captcha.png")
+        BufferedInputFile(captcha_image, filename=CAPTCHA_FILENAME)
     )
     await state.set_state(AuthStates.waiting_for_captcha)
 
@@ -129,7 +150,7 @@ async def process_registration_username(message: Message, state: FSMContext):
     username = message.text.strip()
     
     # Проверяем, не занят ли логин
-    if db.get_user_by_username(username):
+    if await db.get_user_by_username(username):
         await send_error_message(
             message,
             f"Логин '{username}' уже занят. Попробуйте другой."
@@ -200,15 +221,13 @@ async def process_registration_password_confirm(message: Message, state: FSMCont
         return
     
     # Создаем пользователя
-    if db.add_user(username, password):
-        # Получаем ID созданного пользователя
-        user_id = db.authenticate_user(username, password)
-        
+    user_id = await db.add_user(username, password)
+    if user_id:
         # Привязываем Telegram ID
-        db.update_telegram_id(user_id, message.from_user.id)
+        await db.update_telegram_id(user_id, message.from_user.id)
         
-        # Отправляем уведомление админам о новой регистрации
-        await send_admin_notification_registration(bot, username, message.from_user.full_name, message.from_user.id)
+        # Уведомление админам отправляется в фоне
+        admin_notifier.notify("registration", username, message.from_user.full_name, message.from_user.id)
         
         # Отправляем сообщение об успешной регистрации
         await message.answer(
@@ -219,30 +238,7 @@ async def process_registration_password_confirm(message: Message, state: FSMCont
         )
         
         # Теперь отправляем приветственное сообщение с логотипом
-        logo_path = "assets/logo.jpg"
-        
-        if os.path.exists(logo_path):
-            try:
-                await message.answer_photo(
-                    FSInputFile(logo_path),
-                    caption=get_welcome_message(),
-                    parse_mode="HTML"
-                )
-            except Exception as e:
-                logger.error(f"Error sending welcome message with photo: {e}")
-                await message.answer_photo(
-                    FSInputFile(logo_path),
-                    caption=get_welcome_message()
-                )
-        else:
-            try:
-                await message.answer(
-                    get_welcome_message(),
-                    parse_mode="HTML"
-                )
-            except Exception as e:
-                logger.error(f"Error sending welcome message: {e}")
-                await message.answer(get_welcome_message())
+        await send_welcome(message)
         
         # Определяем, является ли пользователь админом
         is_admin = message.from_user.id in ADMIN_IDS
@@ -287,50 +283,6 @@ async def process_username(message: Message, state: FSMContext):
     await message.answer("Теперь введите пароль:", reply_markup=ReplyKeyboardRemove())
     await state.set_state(AuthStates.waiting_for_password)
 
-async def send_admin_notification(bot: Bot, username, user_full_name, user_id):
-    """Отправка уведомления админу о новой авторизации"""
-    try:
-        notification_text = (
-            f"🔔 Новая авторизация!\n\n"
-            f"👤 Пользователь: {user_full_name}\n"
-            f"🆔 Telegram ID: {user_id}\n"
-            f"📝 Логин: {username}\n"
-            f"⏰ Время: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
-        )
-        
-        # Отправляем уведомление всем админам
-        for admin_id in ADMIN_IDS:
-            try:
-                await bot.send_message(admin_id, notification_text)
-                logger.info(f"Admin notification sent to {admin_id}")
-            except Exception as e:
-                logger.error(f"Failed to send notification to admin {admin_id}: {e}")
-                
-    except Exception as e:
-        logger.error(f"Failed to send admin notification: {e}")
-
-async def send_admin_notification_registration(bot: Bot, username, user_full_name, user_id):
-    """Отправка уведомления админу о новой регистрации"""
-    try:
-        notification_text = (
-            f"🆕 Новая регистрация!\n\n"
-            f"👤 Пользователь: {user_full_name}\n"
-            f"🆔 Telegram ID: {user_id}\n"
-            f"📝 Логин: {username}\n"
-            f"⏰ Время: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
-        )
-        
-        # Отправляем уведомление всем админам
-        for admin_id in ADMIN_IDS:
-            try:
-                await bot.send_message(admin_id, notification_text)
-                logger.info(f"Admin notification sent to {admin_id}")
-            except Exception as e:
-                logger.error(f"Failed to send notification to admin {admin_id}: {e}")
-                
-    except Exception as e:
-        logger.error(f"Failed to send admin notification: {e}")
-
 @router.message(AuthStates.waiting_for_password)
 async def process_password(message: Message, state: FSMContext, bot: Bot):
     """Обработка ввода пароля и завершение авторизации"""
@@ -339,7 +291,7 @@ async def process_password(message: Message, state: FSMContext, bot: Bot):
     username = user_data.get('username')
     
     # Проверка учетных данных
-    user_id = db.authenticate_user(username, password)
+    user_id = await db.authenticate_user(username, password)
     
     if not user_id:
         await send_error_message(
@@ -352,10 +304,10 @@ async def process_password(message: Message, state: FSMContext, bot: Bot):
         return
     
     # Обновление Telegram ID пользователя
-    db.update_telegram_id(user_id, message.from_user.id)
+    await db.update_telegram_id(user_id, message.from_user.id)
     
-    # Отправляем уведомление админу о новой авторизации
-    await send_admin_notification(bot, username, message.from_user.full_name, message.from_user.id)
+    # Уведомление админам отправляется в фоне
+    admin_notifier.notify("login", username, message.from_user.full_name, message.from_user.id)
     
     # Отправляем сообщение об успешном входе
     await message.answer(
@@ -364,30 +316,7 @@ async def process_password(message: Message, state: FSMContext, bot: Bot):
     )
     
     # Отправляем приветственное сообщение с логотипом
-    logo_path = "assets/logo.jpg"
-    
-    if os.path.exists(logo_path):
-        try:
-            await message.answer_photo(
-                FSInputFile(logo_path),
-                caption=get_welcome_message(),
-                parse_mode="HTML"
-            )
-        except Exception as e:
-            logger.error(f"Error sending welcome message with photo: {e}")
-            await message.answer_photo(
-                FSInputFile(logo_path),
-                caption=get_welcome_message()
-            )
-    else:
-        try:
-            await message.answer(
-                get_welcome_message(),
-                parse_mode="HTML"
-            )
-        except Exception as e:
-            logger.error(f"Error sending welcome message: {e}")
-            await message.answer(get_welcome_message())
+    await send_welcome(message)
     
     is_admin = message.from_user.id in ADMIN_IDS
     
@@ -431,7 +360,7 @@ async def cmd_logout(event: Message | types.CallbackQuery):
         message = event
         user_id = message.from_user.id
     
-    user = db.get_user_by_telegram_id(user_id)
+    user = await db.get_user_by_telegram_id(user_id)
     
     if not user:
         text = "Вы не авторизованы."
@@ -442,7 +371,7 @@ async def cmd_logout(event: Message | types.CallbackQuery):
         return
     
     # Удаление привязки Telegram ID к аккаунту
-    db.update_telegram_id(user[0], None)
+    await db.update_telegram_id(user[0], None)
     
     # Отправляем сообщение о выходе и кнопку для перезапуска
     await message.answer(
@@ -9,13 +9,14 @@ from models import LinkStates, MessageStates
 from config import ADMIN_IDS
 from utils.keyboards import get_main_keyboard, get_admin_keyboard, get_start_keyboard, get_cancel_keyboard, get_admin_inline_keyboard
 from utils.helpers import send_error_message, send_success_message, cancel_state
+from utils.notifications import link_notifier
 
 # Создаем роутер для пользовательских команд
 router = Router()
 
 async def check_auth(message: Message) -> bool:
     """Проверка авторизации пользователя по сообщению"""
-    user = db.get_user_by_telegram_id(message.from_user.id)
+    user = await db.get_user_by_telegram_id(message.from_user.id)
     if not user:
         await send_error_message(message, "Вы не авторизованы. Используйте /login", reply_markup=get_start_keyboard())
         return False
@@ -23,7 +24,7 @@ async def check_auth(message: Message) -> bool:
 
 async def check_auth_callback(callback: CallbackQuery) -> bool:
     """Проверка авторизации пользователя по callback-запросу"""
-    user = db.get_user_by_telegram_id(callback.from_user.id)
+    user = await db.get_user_by_telegram_id(callback.from_user.id)
     if not user:
         await callback.message.answer("❌ Вы не авторизованы. Используйте /login", reply_markup=get_start_keyboard())
         return False
@@ -73,7 +74,7 @@ async def process_link(message: Message, state: FSMContext):
         return
         
     link = message.text.strip()
-    user = db.get_user_by_telegram_id(message.from_user.id)
+    user = await db.get_user_by_telegram_id(message.from_user.id)
     
     if not user:
         await send_error_message(message, "Вы не авторизованы. Используйте /login")
@@ -81,7 +82,9 @@ async def process_link(message: Message, state: FSMContext):
         return
     
     # Обновление ссылки в базе данных
-    db.update_link(user[0], link)
+    await db.update_link(user[0], link)
+    # Уведомление канала уходит в фоне и не задерживает ответ пользователю
+    link_notifier.notify(user[0], user[1], user[2], link)
     
     from aiogram.types import ReplyKeyboardRemove
     
@@ -97,12 +100,6 @@ async def process_link(message: Message, state: FSMContext):
         await message.answer("Выберите действие:", reply_markup=get_main_keyboard())
     
     await state.clear()
-    
-    # Возвращаем информацию для отправки уведомления в канал
-    return {
-        "username": user[1],
-        "link": link
-    }
 
 @router.callback_query(F.data == "send_message")
 async def callback_send_message(callback: CallbackQuery, state: FSMContext):
@@ -113,7 +110,7 @@ async def callback_send_message(callback: CallbackQuery, state: FSMContext):
         return
     
     # Проверяем, настроен ли канал для сообщений
-    messages_channel = db.get_channel("messages")
+    messages_channel = await db.get_channel("messages")
     if not messages_channel:
         await callback.message.answer(
             "❌ Канал для сообщений не настроен. Обратитесь к администратору.",
@@ -138,14 +135,14 @@ async def process_user_message(message: Message, state: FSMContext, bot: Bot):
         await send_error_message(message, "Сообщение не может быть пустым")
         return
     
-    user = db.get_user_by_telegram_id(message.from_user.id)
+    user = await db.get_user_by_telegram_id(message.from_user.id)
     if not user:
         await send_error_message(message, "Пользователь не найден")
         await state.clear()
         return
     
     try:
-        messages_channel = db.get_channel("messages")
+        messages_channel = await db.get_channel("messages")
         if not messages_channel:
             from aiogram.types import ReplyKeyboardRemove
             await send_error_message(
@@ -198,7 +195,7 @@ async def callback_my_link(callback: CallbackQuery):
     if not await check_auth_callback(callback):
         return
     
-    user = db.get_user_by_telegram_id(callback.from_user.id)
+    user = await db.get_user_by_telegram_id(callback.from_user.id)
     link = user[2]
     
     if link:
@@ -229,7 +226,7 @@ async def cmd_my_link(message: Message):
     if not await check_auth(message):
         return
     
-    user = db.get_user_by_telegram_id(message.from_user.id)
+    user = await db.get_user_by_telegram_id(message.from_user.id)
     link = user[2]
     # Показываем соответствующую клавиатуру в зависимости от роли пользователя
     is_admin = message.from_user.id in ADMIN_IDS
@@ -250,7 +247,7 @@ async def callback_my_link(callback: CallbackQuery):
     if not await check_auth_callback(callback):
         return
     
-    user = db.get_user_by_telegram_id(callback.from_user.id)
+    user = await db.get_user_by_telegram_id(callback.from_user.id)
     link = user[2]
     # Показываем соответствующую клавиатуру в зависимости от роли пользователя
     is_admin = callback.from_user.id in ADMIN_IDS
@@ -268,14 +265,14 @@ async def callback_logout(callback: CallbackQuery):
     """Обработчик инлайн-кнопки выхода"""
     await callback.answer()
     
-    user = db.get_user_by_telegram_id(callback.from_user.id)
+    user = await db.get_user_by_telegram_id(callback.from_user.id)
     
     if not user:
         await callback.message.answer("❌ Вы не авторизованы.", reply_markup=get_start_keyboard())
         return
     
     # Удаление привязки Telegram ID к аккаунту
-    db.update_telegram_id(user[0], None)
+    await db.update_telegram_id(user[0], None)
     await callback.message.answer("Вы успешно вышли из аккаунта.", reply_markup=get_start_keyboard())
 
 def setup(dp: Dispatcher):
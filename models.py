@@ -22,6 +22,10 @@ class AddUserStates(StatesGroup):
     waiting_for_username = State()
     waiting_for_password = State()
 
+class ImportUsersStates(StatesGroup):
+    """Состояния для импорта пользователей из CSV"""
+    waiting_for_file = State()
+
 class EditUserStates(StatesGroup):
     """Состояния для редактирования пользователя админом"""
     waiting_for_user_id = State()
@@ -32,6 +36,7 @@ class EditUserStates(StatesGroup):
 class DeleteUserStates(StatesGroup):
     """Состояния для удаления пользователя админом"""
     waiting_for_user_id = State()
+    waiting_for_confirmation = State()
 
 class BroadcastStates(StatesGroup):
     """Состояния для рассылки сообщений всем пользователям"""
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+import config
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Как часто проверять, не изменился ли файл на диске
+ASSET_RECHECK_INTERVAL = getattr(config, "ASSET_RECHECK_INTERVAL", 60)
+
+LOGO_PATH = "assets/logo.jpg"
+
+
+def file_sha256(path):
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetRegistry:
+    """Реестр статических файлов, уже загруженных в Telegram.
+
+    Файл загружается один раз, его file_id сохраняется в базе вместе с хешем
+    содержимого и дальше переиспользуется. Повторная загрузка происходит только
+    если файл на диске изменился.
+    """
+
+    def __init__(self, recheck_interval=ASSET_RECHECK_INTERVAL):
+        self.recheck_interval = recheck_interval
+        # path -> {"file_id", "sha256", "signature", "checked_at"}
+        self._entries = {}
+        self._locks = {}
+
+    async def answer_photo(self, message: Message, path, **kwargs):
+        """Отправка фото из файла в ответ на сообщение.
+
+        Возвращает отправленное сообщение или None, если файла нет.
+        """
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            entry = await self._resolve(path)
+        if entry is None:
+            return None
+
+        file_id = entry["file_id"]
+        if file_id:
+            try:
+                return await message.answer_photo(file_id, **kwargs)
+            except TelegramBadRequest as e:
+                # Ошибки разметки подписи и т.п. не связаны с file_id
+                if "file" not in e.message.lower():
+                    raise
+                # Например, file_id получен другим ботом - загружаем файл заново
+                logger.warning(f"Cached file_id for {path} rejected, re-uploading: {e}")
+                if entry["file_id"] == file_id:
+                    entry["file_id"] = None
+                    await db.delete_asset(path)
+
+        # Загрузка под блокировкой, чтобы одновременные запросы не загружали файл несколько раз
+        async with lock:
+            if entry["file_id"]:
+                return await message.answer_photo(entry["file_id"], **kwargs)
+
+            sent = await message.answer_photo(FSInputFile(path), **kwargs)
+            entry["file_id"] = sent.photo[-1].file_id
+            await db.set_asset(path, entry["sha256"], entry["file_id"])
+            logger.info(f"Asset {path} uploaded, file_id cached")
+            return sent
+
+    async def _resolve(self, path):
+        """Актуальная запись о файле; хеш пересчитывается, только если файл изменился"""
+        entry = self._entries.get(path)
+        now = time.monotonic()
+        if entry and now - entry["checked_at"] < self.recheck_interval:
+            return entry
+
+        try:
+            stat = await asyncio.to_thread(os.stat, path)
+        except FileNotFoundError:
+            self._entries.pop(path, None)
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if entry and entry["signature"] == signature:
+            entry["checked_at"] = now
+            return entry
+
+        sha256 = await asyncio.to_thread(file_sha256, path)
+        stored = await db.get_asset(path)
+        file_id = stored[1] if stored and stored[0] == sha256 else None
+        entry = {"file_id": file_id, "sha256": sha256, "signature": signature, "checked_at": now}
+        self._entries[path] = entry
+        return entry
+
+
+# Глобальный реестр статических файлов
+asset_registry = AssetRegistry()
@@ -0,0 +1,425 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.types import Message
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramAPIError
+
+import config
+from database import db
+from utils.keyboards import get_broadcast_job_keyboard
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram для массовых рассылок: ~30 сообщений/с в сумме и 1 сообщение/с в один чат
+BROADCAST_RATE = getattr(config, "BROADCAST_RATE", 30)
+BROADCAST_CONCURRENCY = getattr(config, "BROADCAST_CONCURRENCY", 30)
+BROADCAST_PER_CHAT_INTERVAL = getattr(config, "BROADCAST_PER_CHAT_INTERVAL", 1.0)
+BROADCAST_MAX_RETRIES = getattr(config, "BROADCAST_MAX_RETRIES", 3)
+# Сколько получателей обрабатывается между фиксациями прогресса в базе
+BROADCAST_BATCH_SIZE = getattr(config, "BROADCAST_BATCH_SIZE", 100)
+
+BROADCAST_HEADER = "<b>Сообщение от PARTNERS 🔗</b>"
+
+
+class TokenBucket:
+    """Глобальный лимитер отправки с возможностью паузы всего ведра"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Остановка выдачи токенов (например, после TelegramRetryAfter)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        # Время паузы не должно накапливать токены, иначе после нее сразу уйдет вся пачка
+        self._updated = self._paused_until
+
+    async def acquire(self):
+        """Ожидание свободного токена"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ChatRateLimiter:
+    """Ограничение частоты отправки в один чат"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_allowed = {}
+
+    async def wait(self, chat_id):
+        now = time.monotonic()
+        next_allowed = self._next_allowed.get(chat_id, 0.0)
+        if next_allowed > now:
+            self._next_allowed[chat_id] = next_allowed + self.interval
+            await asyncio.sleep(next_allowed - now)
+        else:
+            self._next_allowed[chat_id] = now + self.interval
+
+        # Не даем словарю расти бесконечно на больших рассылках
+        if len(self._next_allowed) > 10000:
+            now = time.monotonic()
+            self._next_allowed = {
+                chat: moment for chat, moment in self._next_allowed.items() if moment > now
+            }
+
+
+@dataclass
+class BroadcastStats:
+    """Статистика рассылки"""
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    retries: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float = None
+
+    @property
+    def processed(self):
+        return self.sent + self.failed + self.blocked
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rate(self):
+        """Фактическая скорость отправки, сообщений в секунду"""
+        elapsed = self.elapsed
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+    def format(self):
+        return (
+            f"📊 Статистика:\n"
+            f"- Отправлено: {self.sent}\n"
+            f"- Не доставлено: {self.failed + self.blocked}"
+            f"{f' (заблокировали бота: {self.blocked})' if self.blocked else ''}\n"
+            f"- Время: {self.elapsed:.1f} с\n"
+            f"- Скорость: {self.rate:.1f} сообщ./с"
+        )
+
+
+class BroadcastEngine:
+    """Параллельная рассылка с глобальным token bucket и лимитом на чат"""
+
+    def __init__(
+        self,
+        rate=BROADCAST_RATE,
+        concurrency=BROADCAST_CONCURRENCY,
+        per_chat_interval=BROADCAST_PER_CHAT_INTERVAL,
+        max_retries=BROADCAST_MAX_RETRIES
+    ):
+        self.bucket = TokenBucket(rate)
+        self.chat_limiter = ChatRateLimiter(per_chat_interval)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+
+    async def send_one(self, chat_id, send, stats):
+        """Отправка одному получателю с повторами при TelegramRetryAfter.
+
+        Возвращает True, если сообщение доставлено.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            await self.chat_limiter.wait(chat_id)
+            try:
+                await send(chat_id)
+                stats.sent += 1
+                return True
+            except TelegramRetryAfter as e:
+                # Telegram просит подождать - ставим на паузу все ведро, а не только этот чат
+                logger.warning(f"Flood control on chat {chat_id}, pausing broadcast for {e.retry_after}s")
+                self.bucket.pause(e.retry_after)
+                stats.retries += 1
+            except TelegramForbiddenError:
+                stats.blocked += 1
+                return False
+            except TelegramAPIError as e:
+                logger.error(f"Failed to send broadcast message to {chat_id}: {e}")
+                stats.failed += 1
+                return False
+            except Exception as e:
+                logger.error(f"Unexpected error while sending broadcast message to {chat_id}: {e}")
+                stats.failed += 1
+                return False
+
+        stats.failed += 1
+        return False
+
+    async def run(self, chat_ids, send, on_progress=None, progress_interval=3.0):
+        """Рассылка по списку chat_id.
+
+        send - корутина send(chat_id), отправляющая одно сообщение,
+        on_progress - необязательная корутина on_progress(stats), вызывается не чаще progress_interval.
+        """
+        stats = BroadcastStats()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        last_progress = time.monotonic()
+
+        async def worker():
+            nonlocal last_progress
+            while True:
+                chat_id = await queue.get()
+                try:
+                    if chat_id is None:
+                        return
+                    await self.send_one(chat_id, send, stats)
+                    now = time.monotonic()
+                    if on_progress and now - last_progress >= progress_interval:
+                        last_progress = now
+                        try:
+                            await on_progress(stats)
+                        except Exception as e:
+                            logger.debug(f"Broadcast progress callback failed: {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            for chat_id in chat_ids:
+                await queue.put(chat_id)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            stats.finished_at = time.monotonic()
+
+        logger.debug(
+            f"Broadcast finished: sent={stats.sent} failed={stats.failed} blocked={stats.blocked} "
+            f"in {stats.elapsed:.1f}s ({stats.rate:.1f} msg/s)"
+        )
+        return stats
+
+
+def extract_broadcast_payload(message: Message):
+    """Извлечение из сообщения админа данных для рассылки.
+
+    Возвращает словарь с типом контента и file_id/текстом или None для неподдерживаемого контента.
+    """
+    if message.text and not message.media_group_id:
+        return {"kind": "text", "text": message.text.strip()}
+    if message.sticker:
+        return {"kind": "sticker", "file_id": message.sticker.file_id}
+
+    media = (
+        ("photo", message.photo[-1] if message.photo else None),
+        ("video", message.video),
+        ("audio", message.audio),
+        ("document", message.document),
+        ("voice", message.voice),
+        ("animation", message.animation),
+    )
+    for kind, item in media:
+        if item:
+            return {"kind": kind, "file_id": item.file_id, "caption": message.caption}
+    return None
+
+
+async def send_broadcast_payload(bot: Bot, chat_id, payload):
+    """Отправка одного сообщения рассылки"""
+    kind = payload["kind"]
+
+    if kind == "text":
+        await bot.send_message(
+            chat_id,
+            f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{payload['text']}",
+            parse_mode="HTML"
+        )
+        return
+    if kind == "sticker":
+        await bot.send_sticker(chat_id, sticker=payload["file_id"])
+        return
+
+    caption = payload.get("caption")
+    formatted_caption = f"<b>Сообщение от PARTNERS 🔗:</b>\n\n{caption}" if caption else BROADCAST_HEADER
+    senders = {
+        "photo": bot.send_photo,
+        "video": bot.send_video,
+        "audio": bot.send_audio,
+        "document": bot.send_document,
+        "voice": bot.send_voice,
+        "animation": bot.send_animation,
+    }
+    await senders[kind](chat_id, payload["file_id"], caption=formatted_caption, parse_mode="HTML")
+
+
+class BroadcastWorker:
+    """Фоновое выполнение сохраненных в базе задач рассылки.
+
+    Прогресс фиксируется после каждой пачки получателей, поэтому после перезапуска
+    рассылка продолжается с последнего подтвержденного пользователя.
+    """
+
+    def __init__(self, batch_size=BROADCAST_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.engine = BroadcastEngine()
+        self._tasks = {}
+
+    async def start(self, bot: Bot):
+        """Запуск воркера и возобновление незавершенных рассылок"""
+        for job_id, *_ in await db.get_broadcast_jobs(("running",)):
+            logger.info(f"Resuming broadcast job {job_id}")
+            self.submit(job_id, bot)
+
+    async def stop(self):
+        """Остановка всех рассылок без изменения их статуса"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def create_job(self, admin_id, payload):
+        """Сохранение новой задачи рассылки в базе"""
+        total = await db.count_broadcast_recipients(admin_id)
+        return await db.create_broadcast_job(admin_id, json.dumps(payload), total)
+
+    def submit(self, job_id, bot: Bot):
+        """Запуск выполнения задачи в фоне.
+
+        Работающая задача сама замечает возобновление (см. _run_job), а уже
+        завершившаяся, но еще не удаленная из _tasks, заменяется новой.
+        """
+        running = self._tasks.get(job_id)
+        if running and not running.done():
+            return
+        task = asyncio.create_task(self._run_job(job_id, bot))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id) if self._tasks.get(job_id) is task else None)
+
+    async def pause(self, job_id):
+        """Приостановка рассылки, остановка происходит после текущей пачки"""
+        return await self._change_status(job_id, ("running",), "paused")
+
+    async def resume(self, job_id, bot: Bot):
+        """Возобновление приостановленной рассылки"""
+        if not await self._change_status(job_id, ("paused",), "running"):
+            return False
+        self.submit(job_id, bot)
+        return True
+
+    async def cancel(self, job_id):
+        """Отмена рассылки"""
+        return await self._change_status(job_id, ("running", "paused"), "cancelled")
+
+    async def _change_status(self, job_id, allowed, status):
+        job = await db.get_broadcast_job(job_id)
+        if not job or job[3] not in allowed:
+            return False
+        await db.set_broadcast_status(job_id, status)
+        return True
+
+    async def _run_job(self, job_id, bot):
+        job = await db.get_broadcast_job(job_id)
+        if not job:
+            return
+        _, admin_id, payload, _, cursor, total, *_ = job
+        payload = json.loads(payload)
+
+        async def send(chat_id):
+            await send_broadcast_payload(bot, chat_id, payload)
+
+        try:
+            while True:
+                status = (await db.get_broadcast_job(job_id))[3]
+                if status != "running":
+                    await self._report(bot, job_id)
+                    # Пока обновлялся отчет, рассылку могли возобновить; submit в это время
+                    # новую задачу не запускает, поэтому продолжаем здесь
+                    if (await db.get_broadcast_job(job_id))[3] == "running":
+                        continue
+                    return
+
+                batch = await db.get_broadcast_recipients(cursor, admin_id, self.batch_size)
+                if not batch:
+                    await db.set_broadcast_status(job_id, "done")
+                    await self._report(bot, job_id)
+                    await self._notify_finished(bot, job_id)
+                    return
+
+                stats = await self.engine.run([telegram_id for _, telegram_id in batch], send)
+                cursor = batch[-1][0]
+                await db.update_broadcast_progress(job_id, cursor, stats.sent, stats.failed, stats.blocked)
+                await self._report(bot, job_id, stats)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast job {job_id} failed: {e}")
+            await db.set_broadcast_status(job_id, "paused")
+            await self._report(bot, job_id)
+
+    async def _report(self, bot, job_id, stats=None):
+        """Обновление сообщения с прогрессом рассылки"""
+        job = await db.get_broadcast_job(job_id)
+        _, _, _, status, _, total, sent, failed, blocked, chat_id, message_id = job
+        if not chat_id or not message_id:
+            return
+
+        text = format_broadcast_job(job_id, status, total, sent, failed, blocked)
+        if stats and status == "running":
+            text += f"\n- Скорость: {stats.rate:.1f} сообщ./с"
+        try:
+            await bot.edit_message_text(
+                text,
+                chat_id=chat_id,
+                message_id=message_id,
+                reply_markup=get_broadcast_job_keyboard(job_id, status)
+            )
+        except TelegramAPIError as e:
+            logger.debug(f"Failed to update broadcast progress message: {e}")
+
+    async def _notify_finished(self, bot, job_id):
+        _, admin_id, _, status, _, total, sent, failed, blocked, *_ = await db.get_broadcast_job(job_id)
+        try:
+            await bot.send_message(
+                admin_id,
+                f"✅ Рассылка завершена!\n\n{format_broadcast_job(job_id, status, total, sent, failed, blocked)}"
+            )
+        except TelegramAPIError as e:
+            logger.error(f"Failed to notify admin {admin_id} about broadcast {job_id}: {e}")
+
+
+BROADCAST_STATUS_TEXT = {
+    "running": "⏳ Выполняется",
+    "paused": "⏸ Приостановлена",
+    "cancelled": "⛔ Отменена",
+    "done": "✅ Завершена",
+}
+
+
+def format_broadcast_job(job_id, status, total, sent, failed, blocked):
+    """Текстовое описание задачи рассылки"""
+    processed = sent + failed + blocked
+    return (
+        f"📢 Рассылка #{job_id}: {BROADCAST_STATUS_TEXT.get(status, status)}\n"
+        f"- Обработано: {processed} из {total}\n"
+        f"- Отправлено: {sent}\n"
+        f"- Не доставлено: {failed + blocked}"
+        f"{f' (заблокировали бота: {blocked})' if blocked else ''}"
+    )
+
+
+# Глобальный воркер рассылок, запускается в bot.on_startup
+broadcast_worker = BroadcastWorker()
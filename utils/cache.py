@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Маркер отсутствия значения в кэше (None - допустимое закэшированное значение)
+MISSING = object()
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с ограничением времени жизни записей.
+
+    Поколение кэша увеличивается при каждой инвалидации: значение, прочитанное
+    из базы до инвалидации, не попадет в кэш (см. set с параметром generation).
+    """
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        """Получение значения, при промахе возвращается default"""
+        with self._lock:
+            item = self._data.get(key, MISSING)
+            if item is not MISSING:
+                value, expires_at = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        """Сохранение значения.
+
+        Если передан generation и с тех пор кэш инвалидировался, значение не сохраняется.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *keys):
+        """Удаление записей из кэша"""
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Счетчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -1,54 +1,114 @@
+import functools
 import os
 import random
 import string
 from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 
+import config
+
+WIDTH = 200
+HEIGHT = 80
+FONT_SIZE = 45
+# Output format: "png" (4-colour paletted PNG) or "webp"
+CAPTCHA_FORMAT = getattr(config, "CAPTCHA_FORMAT", "png").lower()
+CAPTCHA_FILENAME = f"captcha.{CAPTCHA_FORMAT}"
+
+FONT_CANDIDATES = (
+    "arial.ttf",
+    "DejaVuSans-Bold.ttf",
+    "DejaVuSans.ttf",
+    "LiberationSans-Regular.ttf",
+)
+# Share of noise pixels, matches the former 1000 random points on a 200x80 image
+NOISE_DENSITY = 1000 / (WIDTH * HEIGHT)
+NOISE_TILES = 8
+
+WHITE = 255
+GRAY = 128
+BLACK = 0
+
+
 def generate_captcha_text(length=5):
     """Generate random text for captcha"""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
-def generate_captcha_image(text):
+
+@functools.lru_cache(maxsize=None)
+def get_font(size=FONT_SIZE):
+    """Load the captcha font once per size"""
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        # Pillow >= 10.1 ships a scalable default font
+        return ImageFont.load_default(size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=1)
+def _noise_tiles():
+    """Pre-generated noise masks, twice the image size so a random crop still looks random"""
+    threshold = int(256 * NOISE_DENSITY)
+    lut = [255 if value < threshold else 0 for value in range(256)]
+    size = (WIDTH * 2, HEIGHT * 2)
+    return [
+        Image.frombytes("L", size, os.urandom(size[0] * size[1])).point(lut)
+        for _ in range(NOISE_TILES)
+    ]
+
+
+def _noise_mask():
+    tile = random.choice(_noise_tiles())
+    x = random.randint(0, WIDTH)
+    y = random.randint(0, HEIGHT)
+    return tile.crop((x, y, x + WIDTH, y + HEIGHT))
+
+
+def generate_captcha_image(text, image_format=CAPTCHA_FORMAT):
     """Generate captcha image from text"""
-    # Create image with white background
-    width = 200
-    height = 80
-    image = Image.new('RGB', (width, height), color='white')
+    # Grayscale canvas: the captcha only uses white, gray and black
+    image = Image.new('L', (WIDTH, HEIGHT), color=WHITE)
     draw = ImageDraw.Draw(image)
-    
-    # Add noise (random dots)
-    for _ in range(1000):
-        x = random.randint(0, width)
-        y = random.randint(0, height)
-        draw.point((x, y), fill='gray')
-    
+
+    # Add noise (random dots) in one paste instead of per-pixel drawing
+    image.paste(GRAY, (0, 0, WIDTH, HEIGHT), _noise_mask())
+
     # Add lines for noise
     for _ in range(5):
-        x1 = random.randint(0, width)
-        y1 = random.randint(0, height)
-        x2 = random.randint(0, width)
-        y2 = random.randint(0, height)
-        draw.line([(x1, y1), (x2, y2)], fill='gray', width=1)
-    
-    # Calculate font size and position
-    font_size = 45
-    try:
-        # Try to use Arial font if available
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except:
-        # Fallback to default font
-        font = ImageFont.load_default()
-    
+        x1 = random.randint(0, WIDTH)
+        y1 = random.randint(0, HEIGHT)
+        x2 = random.randint(0, WIDTH)
+        y2 = random.randint(0, HEIGHT)
+        draw.line([(x1, y1), (x2, y2)], fill=GRAY, width=1)
+
     # Calculate text size and position
+    font = get_font()
     text_width = font.getlength(text)
-    text_x = (width - text_width) // 2
-    text_y = (height - font_size) // 2
-    
+    text_x = (WIDTH - text_width) // 2
+    text_y = (HEIGHT - FONT_SIZE) // 2
+
     # Add text to image
-    draw.text((text_x, text_y), text, font=font, fill='black')
-    
+    draw.text((text_x, text_y), text, font=font, fill=BLACK)
+
     # Return image as bytes
+    # Antialiased text has intermediate shades, 4 colours keep it readable at 2 bits per pixel
+    image = image.quantize(colors=4, method=Image.Quantize.MEDIANCUT)
     img_byte_array = BytesIO()
-    image.save(img_byte_array, format='PNG')
-    img_byte_array.seek(0)
+    if image_format == "webp":
+        image.save(img_byte_array, format='WEBP', lossless=True, quality=100, method=4)
+    else:
+        image.save(img_byte_array, format='PNG', bits=2, compress_level=6)
     return img_byte_array.getvalue()
+
+
+def render_captcha(length=5):
+    """Generate captcha text together with its image.
+
+    Top-level function so it can be executed in a process pool.
+    """
+    text = generate_captcha_text(length)
+    return text, generate_captcha_image(text)
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from utils.captcha import render_captcha
+from utils.metrics import registry, Gauge, CallbackCounter
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Минимальный и максимальный размер пула готовых капч
+CAPTCHA_POOL_MIN_SIZE = getattr(config, "CAPTCHA_POOL_MIN_SIZE", 10)
+CAPTCHA_POOL_MAX_SIZE = getattr(config, "CAPTCHA_POOL_MAX_SIZE", 200)
+# Пул держит запас капч на столько секунд при текущей скорости расхода
+CAPTCHA_POOL_HORIZON = getattr(config, "CAPTCHA_POOL_HORIZON", 30)
+CAPTCHA_POOL_WORKERS = getattr(config, "CAPTCHA_POOL_WORKERS", 2)
+
+
+def _mp_context():
+    """Процессы рендеринга запускаются через forkserver (на Windows - spawn), а не fork.
+
+    Сервер один раз импортирует главный модуль и этот модуль, а процессы пула
+    ответвляются от него уже без потоков и без повторных импортов.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["__main__", __name__])
+    return context
+
+
+def _init_worker():
+    # Ctrl+C приходит всей группе процессов; пул останавливает сам бот в on_shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class CaptchaPool:
+    """Пул заранее сгенерированных капч (текст, PNG).
+
+    Капчи рисуются в пуле процессов, поэтому Pillow не блокирует цикл событий.
+    Фоновая задача пополняет пул только после расхода, а целевой размер пула
+    подстраивается под скорость, с которой капчи забирают.
+    """
+
+    def __init__(
+        self,
+        min_size=CAPTCHA_POOL_MIN_SIZE,
+        max_size=CAPTCHA_POOL_MAX_SIZE,
+        horizon=CAPTCHA_POOL_HORIZON,
+        workers=CAPTCHA_POOL_WORKERS
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.horizon = horizon
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self._items = deque()
+        self._executor = None
+        self._task = None
+        self._wakeup = asyncio.Event()
+        # Экспоненциально сглаженная скорость расхода, капч в секунду
+        self._rate = 0.0
+        self._rate_updated = time.monotonic()
+
+    @property
+    def target_size(self):
+        """Сколько капч держать в запасе при текущей скорости расхода"""
+        wanted = math.ceil(self._decayed_rate() * self.horizon)
+        return max(self.min_size, min(self.max_size, wanted))
+
+    def __len__(self):
+        return len(self._items)
+
+    async def start(self):
+        """Запуск пула процессов и фонового пополнения"""
+        # К моменту запуска уже работают потоки базы данных и хеширования паролей:
+        # fork копирует их захваченные блокировки и может подвесить дочерний процесс
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context(),
+                                             initializer=_init_worker)
+        self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        """Остановка фонового пополнения и пула процессов"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def get(self):
+        """Получение готовой капчи: кортеж (текст, PNG)"""
+        self._record_consumption()
+        self._wakeup.set()
+        if self._items:
+            self.hits += 1
+            return self._items.popleft()
+
+        # Пул опустел (всплеск /start) - рисуем капчу сразу, но все равно вне цикла событий
+        self.misses += 1
+        with span("captcha.render"):
+            return await self._render()
+
+    async def _render(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, render_captcha)
+
+    async def _refill_loop(self):
+        while True:
+            missing = self.target_size - len(self._items)
+            if missing <= 0:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Не больше одной капчи на процесс за раз, чтобы пополнение шло со скоростью расхода
+            batch = min(missing, self.workers)
+            try:
+                items = await asyncio.gather(*(self._render() for _ in range(batch)))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to render captcha: {e}")
+                await asyncio.sleep(1)
+                continue
+            self._items.extend(items)
+
+    def _decayed_rate(self):
+        elapsed = time.monotonic() - self._rate_updated
+        return self._rate * math.exp(-elapsed / self.horizon)
+
+    def _record_consumption(self):
+        self._rate = self._decayed_rate() + 1 / self.horizon
+        self._rate_updated = time.monotonic()
+
+    def stats(self):
+        return {
+            "size": len(self._items),
+            "target_size": self.target_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rate": self._decayed_rate(),
+        }
+
+
+# Глобальный пул капч, запускается в bot.on_startup
+captcha_pool = CaptchaPool()
+
+# hits и misses только растут и отдаются отдельным счетчиком
+CAPTCHA_POOL_COUNTERS = ("hits", "misses")
+
+registry.register(Gauge(
+    "bot_captcha_pool", "Captcha pool state",
+    lambda: {(name,): value for name, value in captcha_pool.stats().items() if name not in CAPTCHA_POOL_COUNTERS},
+    ("stat",)
+))
+registry.register(CallbackCounter(
+    "bot_captcha_pool_requests_total", "Captcha pool lookups by result",
+    lambda: {("hit",): captcha_pool.hits, ("miss",): captcha_pool.misses},
+    ("result",)
+))
@@ -0,0 +1,176 @@
+import asyncio
+import functools
+import logging
+import time
+import weakref
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+
+import config
+from utils.metrics import registry, Counter, Gauge, Histogram, DB_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Сколько обновлений обрабатывается одновременно (всех пользователей вместе)
+UPDATE_CONCURRENCY = getattr(config, "UPDATE_CONCURRENCY", 64)
+# Сколько обновлений одного пользователя может ждать обработки, включая текущее;
+# остальные отбрасываются
+USER_QUEUE_SIZE = getattr(config, "USER_QUEUE_SIZE", 10)
+# Сколько при остановке ждать завершения уже принятых обновлений (секунды)
+UPDATE_SHUTDOWN_TIMEOUT = getattr(config, "UPDATE_SHUTDOWN_TIMEOUT", 30)
+
+UPDATE_QUEUE_WAIT = registry.register(Histogram(
+    "bot_update_queue_wait_seconds", "Time an update waited for its user's previous updates and a free slot",
+    buckets=DB_BUCKETS + (2.5, 5.0, 10.0)
+))
+UPDATES_DROPPED = registry.register(Counter(
+    "bot_updates_dropped_total", "Updates dropped because the user's queue was full"
+))
+
+
+# Все экземпляры UserLanes, для метрики bot_update_lanes
+_instances = weakref.WeakSet()
+
+
+def _lanes_stats():
+    totals = {"users": 0, "waiting": 0, "running": 0}
+    for lanes in list(_instances):
+        for name, value in lanes.stats().items():
+            if name in totals:
+                totals[name] += value
+    return {(name,): value for name, value in totals.items()}
+
+
+registry.register(Gauge("bot_update_lanes", "Updates waiting in and running from per-user queues",
+                        _lanes_stats, ("stat",)))
+
+
+class _Lane:
+    """Очередь одного пользователя: блокировка и число ожидающих обновлений"""
+
+    __slots__ = ("lock", "size")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.size = 0
+
+
+class UserLanes:
+    """Параллельная обработка разных пользователей и последовательная - одного.
+
+    Обновления пользователя выполняются строго в порядке поступления (asyncio.Lock
+    будит ожидающих по очереди), поэтому состояние FSM читается уже после
+    завершения предыдущего обновления. Общее число выполняемых обновлений
+    ограничено concurrency; место занимается только после того, как подошла
+    очередь пользователя, так что один пользователь с десятком сообщений
+    не занимает слоты остальных.
+    """
+
+    def __init__(self, concurrency=UPDATE_CONCURRENCY, queue_size=USER_QUEUE_SIZE):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.waiting = 0
+        self.running = 0
+        self.dropped = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lanes = {}
+        self._closed = False
+        # Принятые и еще не завершенные обновления
+        self._active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        _instances.add(self)
+
+    async def run(self, user_id, func):
+        """Выполнение func() в очереди пользователя user_id (None - только общее ограничение).
+
+        Возвращает результат func() или UNHANDLED, если очередь пользователя переполнена
+        или прием обновлений остановлен (close).
+        """
+        if self._closed:
+            logger.debug(f"Ignoring update from user {user_id}: shutting down")
+            return UNHANDLED
+        lane = None
+        if user_id is not None:
+            lane = self._lanes.get(user_id)
+            if lane is None:
+                lane = self._lanes[user_id] = _Lane()
+            if lane.size >= self.queue_size:
+                self.dropped += 1
+                UPDATES_DROPPED.inc()
+                logger.warning(f"Dropping update from user {user_id}: {lane.size} updates already queued")
+                return UNHANDLED
+            lane.size += 1
+
+        queued = time.perf_counter()
+        started = False
+        self.waiting += 1
+        self._active += 1
+        self._idle.clear()
+        try:
+            if lane:
+                await lane.lock.acquire()
+            try:
+                async with self._semaphore:
+                    started = True
+                    self.waiting -= 1
+                    self.running += 1
+                    UPDATE_QUEUE_WAIT.observe(time.perf_counter() - queued)
+                    try:
+                        return await func()
+                    finally:
+                        self.running -= 1
+            finally:
+                if lane:
+                    lane.lock.release()
+        finally:
+            if not started:
+                self.waiting -= 1
+            self._active -= 1
+            if not self._active:
+                self._idle.set()
+            if lane:
+                lane.size -= 1
+                if not lane.size:
+                    del self._lanes[user_id]
+
+    async def close(self, timeout=UPDATE_SHUTDOWN_TIMEOUT):
+        """Прекращение приема обновлений и ожидание уже принятых, не дольше timeout"""
+        self._closed = True
+        waiter = asyncio.ensure_future(self._idle.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            waiter.cancel()
+        if self._active:
+            logger.warning(f"{self._active} updates still in progress after {timeout}s")
+
+    def stats(self):
+        return {
+            "users": len(self._lanes),
+            "waiting": self.waiting,
+            "running": self.running,
+            "dropped": self.dropped,
+        }
+
+
+class OrderedDispatcher(Dispatcher):
+    """Диспетчер, пропускающий каждое обновление через UserLanes по from_user.id.
+
+    Подходит и для поллинга (aiogram запускает каждое обновление отдельной задачей),
+    и для вебхука: порядок обновлений одного пользователя сохраняется, а медленное
+    обновление задерживает только своего пользователя.
+    """
+
+    def __init__(self, *, lanes=None, **kwargs):
+        super().__init__(**kwargs)
+        self.lanes = lanes or UserLanes()
+
+    async def feed_update(self, bot, update, **kwargs):
+        _, user, _ = UserContextMiddleware.resolve_event_context(update)
+        return await self.lanes.run(
+            user.id if user else None,
+            functools.partial(super().feed_update, bot, update, **kwargs)
+        )
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import time
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage
+
+import config
+from database import db
+from utils.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+# Состояние, которое не менялось дольше этого времени (секунды), считается брошенным
+FSM_STATE_TTL = getattr(config, "FSM_STATE_TTL", 24 * 60 * 60)
+# Изменения копятся в памяти не дольше этого времени и записываются одной транзакцией
+FSM_FLUSH_INTERVAL = getattr(config, "FSM_FLUSH_INTERVAL", 0.5)
+FSM_SWEEP_INTERVAL = getattr(config, "FSM_SWEEP_INTERVAL", 10 * 60)
+FSM_CACHE_SIZE = getattr(config, "FSM_CACHE_SIZE", 10000)
+
+EMPTY_DATA = "{}"
+
+
+def storage_key(key):
+    """Строковый ключ записи для StorageKey aiogram"""
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище FSM в базе бота.
+
+    Состояния переживают перезапуск, а в памяти держатся только ограниченный
+    кэш последних записей и изменения, еще не записанные в базу. Изменения
+    объединяются: за FSM_FLUSH_INTERVAL в базу попадает последняя версия
+    каждой записи. Брошенные состояния старше ttl не читаются и периодически
+    удаляются фоновой задачей.
+    """
+
+    def __init__(self, ttl=FSM_STATE_TTL, flush_interval=FSM_FLUSH_INTERVAL,
+                 sweep_interval=FSM_SWEEP_INTERVAL, cache_size=FSM_CACHE_SIZE):
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        # key -> (state, data, updated_at)
+        self._cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._pending = {}
+        # Изменения, которые записываются в базу прямо сейчас
+        self._flushing = {}
+        # Ключи, которые сейчас читаются из базы: key -> метка загрузки; запись по ключу
+        # удаляет метку, и прочитанное до записи значение не попадает в кэш
+        self._loading = {}
+        self._dirty = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._flush_task = None
+        self._sweep_task = None
+
+    async def start(self):
+        """Запуск фоновой записи изменений и очистки устаревших состояний"""
+        if self._flush_task is None:
+            self._closed.clear()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def close(self):
+        """Остановка фоновых задач и запись оставшихся изменений.
+
+        Задачу записи не отменяем: она дописывает текущую пачку и завершается
+        сама, иначе отмена потеряла бы уже изъятые из _pending изменения.
+        """
+        self._closed.set()
+        self._dirty.set()
+        if self._flush_task:
+            await self._flush_task
+        if self._sweep_task:
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = self._sweep_task = None
+        try:
+            await self.flush()
+        except Exception:
+            # Ошибка уже записана в лог в flush
+            pass
+
+    async def _record(self, key):
+        """Текущая запись (state, data, updated_at); для отсутствующей или устаревшей - пустая"""
+        record = self._pending.get(key) or self._flushing.get(key)
+        if record is None:
+            record = self._cache.get(key)
+            if record is MISSING:
+                token = self._loading[key] = object()
+                try:
+                    row = await db.get_fsm_record(key)
+                finally:
+                    fresh = self._loading.get(key) is token
+                    if fresh:
+                        del self._loading[key]
+                record = (row[0], json.loads(row[1]), row[2]) if row else (None, {}, 0.0)
+                # Пока шел запрос, запись могла измениться
+                changed = self._pending.get(key) or self._flushing.get(key)
+                if changed:
+                    record = changed
+                elif fresh:
+                    self._cache.set(key, record)
+        if record[2] < time.time() - self.ttl:
+            return None, {}, 0.0
+        return record
+
+    def _write(self, key, state, data):
+        record = (state, data, time.time())
+        # Только эта запись: общее поколение кэша не трогаем, чтобы не отменять
+        # параллельные загрузки других ключей
+        self._loading.pop(key, None)
+        self._cache.set(key, record)
+        self._pending[key] = record
+        self._dirty.set()
+
+    async def set_state(self, key, state=None):
+        key = storage_key(key)
+        _, data, _ = await self._record(key)
+        self._write(key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key):
+        state, _, _ = await self._record(storage_key(key))
+        return state
+
+    async def set_data(self, key, data):
+        key = storage_key(key)
+        state, _, _ = await self._record(key)
+        self._write(key, state, dict(data))
+
+    async def get_data(self, key):
+        _, data, _ = await self._record(storage_key(key))
+        return dict(data)
+
+    async def flush(self):
+        """Запись накопленных изменений в базу"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        self._flushing = pending
+        records = [
+            (key, state, json.dumps(data, ensure_ascii=False) if data else EMPTY_DATA, updated_at)
+            for key, (state, data, updated_at) in pending.items()
+        ]
+        try:
+            await db.save_fsm_records(records)
+        except BaseException as e:
+            # При отмене запрос мог так и не дойти до потока записи
+            if not isinstance(e, asyncio.CancelledError):
+                logger.error(f"Failed to save {len(records)} FSM records: {e}")
+            # Возвращаем изменения в очередь, не затирая более новые
+            for key, record in pending.items():
+                self._pending.setdefault(key, record)
+            self._dirty.set()
+            raise
+        finally:
+            self._flushing = {}
+
+    async def _flush_loop(self):
+        while not self._closed.is_set():
+            await self._dirty.wait()
+            # Даем накопиться изменениям, чтобы записать их одной транзакцией;
+            # close() прерывает ожидание
+            waiter = asyncio.ensure_future(self._closed.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=self.flush_interval)
+            finally:
+                waiter.cancel()
+            self._dirty.clear()
+            try:
+                await self.flush()
+            except Exception:
+                pass
+
+    async def sweep(self):
+        """Удаление из базы состояний, не менявшихся дольше ttl"""
+        deleted = await db.delete_expired_fsm_records(time.time() - self.ttl)
+        if deleted:
+            logger.info(f"Removed {deleted} expired FSM states")
+        return deleted
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Failed to remove expired FSM states: {e}")
+            await asyncio.sleep(self.sweep_interval)
@@ -1,5 +1,7 @@
 from aiogram import types
 from aiogram.fsm.context import FSMContext
+from aiogram.types import BufferedInputFile
+import config
 from config import ADMIN_IDS
 from utils.keyboards import get_admin_keyboard, get_start_keyboard, get_admin_inline_keyboard
 
@@ -18,7 +20,7 @@ async def cancel_state(message: types.Message, state: FSMContext) -> bool:
         # Проверяем, авторизован ли пользователь
         from database import db  # Import here to avoid circular imports
         from aiogram.types import ReplyKeyboardRemove
-        user = db.get_user_by_telegram_id(message.from_user.id)
+        user = await db.get_user_by_telegram_id(message.from_user.id)
         
         if user:
             # Пользователь авторизован
@@ -45,25 +47,70 @@ async def cancel_state(message: types.Message, state: FSMContext) -> bool:
         return True
     return False
 
-def format_user_list(users: list) -> str:
-    """Форматирование списка пользователей с выводом паролей"""
-    if not users:
-        return "Список пользователей пуст."
-    
-    # Для отображения списка пользователей нужно получить пароли
-    from database import db
-    
-    report = "📊 Список всех пользователей:\n\n"
-    for user_id, username, telegram_id, link in users:
-        # Получаем данные пользователя включая пароль
-        user_data = db.get_user_by_username(username)
-        password = user_data[1] if user_data else "Не найден"  # user_data[1] - это пароль
-        
-        report += f"ID: {user_id} | Логин: {username}\n"
-        report += f"   Пароль: {password}\n"
-        report += f"   Статус: {'✅ Авторизован' if telegram_id else '❌ Не авторизован'}\n"
-        report += f"   Информация: {link or '—'}\n\n"
-    return report
+EMPTY_USER_LIST = "Список пользователей пуст."
+USER_LIST_HEADER = "📊 Список всех пользователей:\n\n"
+
+# Длинные отчеты больше этого числа сообщений отправляются файлом, чтобы не упираться
+# в лимиты Telegram и не засыпать чат админа
+REPORT_MAX_MESSAGES = getattr(config, "REPORT_MAX_MESSAGES", 3)
+
+def format_user_entry(row) -> str:
+    """Запись одного пользователя (id, username, telegram_id, link) в отчете"""
+    user_id, username, telegram_id, link = row
+    return (
+        f"ID: {user_id} | Логин: {username}\n"
+        f"   Статус: {'✅ Авторизован' if telegram_id else '❌ Не авторизован'}\n"
+        f"   Информация: {link or '—'}\n\n"
+    )
+
+def format_user_list(rows) -> str:
+    """Форматирование списка пользователей.
+
+    rows - итерируемые строки (id, username, telegram_id, link), например db.iter_user_report().
+    """
+    parts = [format_user_entry(row) for row in rows]
+    if not parts:
+        return EMPTY_USER_LIST
+    return USER_LIST_HEADER + "".join(parts)
+
+def write_user_list(rows, file) -> int:
+    """Запись списка пользователей в текстовый файл построчно; возвращает число пользователей"""
+    count = 0
+    file.write(USER_LIST_HEADER)
+    for row in rows:
+        file.write(format_user_entry(row))
+        count += 1
+    return count
+
+def split_message(text: str, limit: int = 4096) -> list:
+    """Разбиение длинного текста на части не длиннее limit по границам строк"""
+    chunks = []
+    current = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                chunks.append("".join(current))
+                current, size = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if size + len(line) > limit:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+async def answer_long_text(message: types.Message, text: str, filename: str, caption: str = None):
+    """Отправка текста несколькими сообщениями или, если их больше REPORT_MAX_MESSAGES, одним файлом"""
+    chunks = split_message(text)
+    if len(chunks) <= REPORT_MAX_MESSAGES:
+        for chunk in chunks:
+            await message.answer(chunk)
+        return
+    await message.answer_document(BufferedInputFile(text.encode("utf-8"), filename=filename), caption=caption)
 
 async def send_error_message(message: types.Message, error_text: str, reply_markup=None):
     """Отправка сообщения об ошибке"""
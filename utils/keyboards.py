@@ -48,8 +48,10 @@ def get_admin_keyboard():
     """Обычная клавиатура для функций администрирования"""
     kb = [
         [KeyboardButton(text='👥 Пользователи'), KeyboardButton(text='🏪 Добавить')],
+        [KeyboardButton(text='📥 Импорт'), KeyboardButton(text='📤 Экспорт')],
         [KeyboardButton(text='✏️ Изменить'), KeyboardButton(text='❌ Удалить')],
         [KeyboardButton(text='📢 Рассылка'), KeyboardButton(text='📩 Сообщение')],
+        [KeyboardButton(text='📊 Рассылки')],
         [KeyboardButton(text='✏️ Изменить приветствие')],
         [KeyboardButton(text='📋 Канал для ссылок'), KeyboardButton(text='💬 Канал для сообщений')]
     ]
@@ -68,4 +70,52 @@ def get_cancel_keyboard():
     kb = [
         [KeyboardButton(text='❌ Отмена')]
     ]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
\ No newline at end of file
+    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+
+def get_broadcast_job_keyboard(job_id, status):
+    """Инлайн-клавиатура управления задачей рассылки"""
+    if status == "running":
+        kb = [[
+            InlineKeyboardButton(text='⏸ Пауза', callback_data=f'bc:pause:{job_id}'),
+            InlineKeyboardButton(text='⛔ Отменить', callback_data=f'bc:cancel:{job_id}')
+        ]]
+    elif status == "paused":
+        kb = [[
+            InlineKeyboardButton(text='▶️ Продолжить', callback_data=f'bc:resume:{job_id}'),
+            InlineKeyboardButton(text='⛔ Отменить', callback_data=f'bc:cancel:{job_id}')
+        ]]
+    else:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=kb)
+
+
+def get_delete_user_confirm_keyboard(user_id):
+    """Инлайн-клавиатура подтверждения удаления пользователя"""
+    kb = [[
+        InlineKeyboardButton(text='🗑 Удалить', callback_data=f'du:confirm:{user_id}'),
+        InlineKeyboardButton(text='↩️ Не удалять', callback_data=f'du:cancel:{user_id}')
+    ]]
+    return InlineKeyboardMarkup(inline_keyboard=kb)
+
+
+def get_user_browser_keyboard(action, users, has_prev, has_next):
+    """Инлайн-клавиатура выбора пользователя со страницами.
+
+    action - для чего выбирается пользователь (edit, delete, message),
+    users - строки (id, username, telegram_id) текущей страницы.
+    """
+    kb = [
+        [InlineKeyboardButton(
+            text=f"{'✅' if telegram_id else '❌'} {user_id} | {username}",
+            callback_data=f'ub:{action}:pick:{user_id}'
+        )]
+        for user_id, username, telegram_id in users
+    ]
+    nav = []
+    if has_prev:
+        nav.append(InlineKeyboardButton(text='◀️ Назад', callback_data=f'ub:{action}:prev:{users[0][0]}'))
+    if has_next:
+        nav.append(InlineKeyboardButton(text='Вперед ▶️', callback_data=f'ub:{action}:next:{users[-1][0]}'))
+    if nav:
+        kb.append(nav)
+    return InlineKeyboardMarkup(inline_keyboard=kb)
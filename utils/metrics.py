@@ -0,0 +1,252 @@
+import logging
+import threading
+import time
+
+from aiohttp import web
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Локальный адрес страницы метрик в формате Prometheus; METRICS_PORT = None отключает ее
+METRICS_HOST = getattr(config, "METRICS_HOST", "127.0.0.1")
+METRICS_PORT = getattr(config, "METRICS_PORT", 9108)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Метрика с набором меток; значения обновляются из любых потоков"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [счетчики по корзинам..., сумма, количество]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def _render_samples(self, items):
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(state[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class Gauge(Metric):
+    """Значение, которое вычисляется при каждом чтении метрик.
+
+    func возвращает число или словарь {кортеж значений меток: число}.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, func, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+
+    def render(self):
+        value = self.func()
+        items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *(f"{self.name}{_labels(self.labelnames, key)} {_number(sample)}" for key, sample in items),
+        ]
+
+
+class CallbackCounter(Gauge):
+    """Счетчик, значение которого хранит сам объект (например, hits у кэша).
+
+    func работает как у Gauge, но значения только растут, поэтому метрика
+    объявляется как counter и к ней применимы rate() и increase().
+    """
+
+    kind = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HANDLER_DURATION = registry.register(Histogram(
+    "bot_handler_duration_seconds", "Handler execution time", ("event", "handler")
+))
+HANDLER_ERRORS = registry.register(Counter(
+    "bot_handler_errors_total", "Unhandled exceptions raised by handlers", ("event", "handler", "error")
+))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "bot_db_query_duration_seconds", "Database method execution time in a database thread",
+    ("method",), buckets=DB_BUCKETS
+))
+DB_QUEUE_WAIT = registry.register(Histogram(
+    "bot_db_queue_wait_seconds", "Time a database call waited for a free database thread",
+    ("pool",), buckets=DB_BUCKETS
+))
+TELEGRAM_REQUEST_DURATION = registry.register(Histogram(
+    "bot_telegram_request_duration_seconds", "Outbound Bot API request time", ("method", "status")
+))
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Время выполнения и ошибки обработчиков.
+
+    Регистрируется как внутренний middleware, поэтому в data уже есть
+    выбранный обработчик, а метрика подписывается его именем.
+    """
+
+    def __init__(self, event):
+        self.event = event
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.inc(event=self.event, handler=name, error=type(e).__name__)
+            raise
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, event=self.event, handler=name)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Время исходящих запросов к Bot API"""
+
+    async def __call__(self, make_request, bot, method):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await make_request(bot, method)
+            status = "ok"
+            return response
+        finally:
+            TELEGRAM_REQUEST_DURATION.observe(
+                time.perf_counter() - started, method=method.__api_method__, status=status
+            )
+
+
+def setup_metrics(dp, bot):
+    """Подключение сбора метрик к диспетчеру и сессии бота"""
+    for event in ("message", "callback_query"):
+        dp.observers[event].middleware(HandlerMetricsMiddleware(event))
+    bot.session.middleware(TelegramMetricsMiddleware())
+
+
+async def handle_metrics(request):
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+class MetricsServer:
+    """HTTP-сервер со страницей /metrics"""
+
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        if self.port is None or self._runner:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+metrics_server = MetricsServer()
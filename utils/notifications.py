@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+
+import config
+from database import db
+from utils.helpers import split_message
+from utils.outbox import outbox
+
+logger = logging.getLogger(__name__)
+
+# Уведомление уходит, когда пользователь не менял ссылку столько секунд
+LINK_NOTIFY_DEBOUNCE = getattr(config, "LINK_NOTIFY_DEBOUNCE", 30)
+# ...но не позже, чем через столько секунд после первого изменения
+LINK_NOTIFY_MAX_DELAY = getattr(config, "LINK_NOTIFY_MAX_DELAY", 120)
+# Изменения, готовые к отправке в пределах этого окна, объединяются в одно сообщение
+LINK_NOTIFY_BATCH_WINDOW = getattr(config, "LINK_NOTIFY_BATCH_WINDOW", 5)
+# Если за ADMIN_NOTIFY_WINDOW секунд событий больше ADMIN_NOTIFY_DIGEST_THRESHOLD,
+# админы получают сводку раз в ADMIN_NOTIFY_DIGEST_INTERVAL секунд вместо сообщения на каждое событие
+ADMIN_NOTIFY_WINDOW = getattr(config, "ADMIN_NOTIFY_WINDOW", 60)
+ADMIN_NOTIFY_DIGEST_THRESHOLD = getattr(config, "ADMIN_NOTIFY_DIGEST_THRESHOLD", 10)
+ADMIN_NOTIFY_DIGEST_INTERVAL = getattr(config, "ADMIN_NOTIFY_DIGEST_INTERVAL", 60)
+
+MESSAGE_LIMIT = 4096
+
+
+class LinkChange:
+    """Накопленное изменение ссылки одного пользователя"""
+
+    def __init__(self, username, old_link, link, now):
+        self.username = username
+        self.old_link = old_link
+        self.link = link
+        self.first_at = now
+        self.last_at = now
+        self.updates = 1
+
+    def format(self):
+        return f"👤 Пользователь: {self.username}\n🔗 Ссылки: \n{self.link}"
+
+
+def format_link_changes(changes):
+    """Тексты сообщений для канала: одно изменение - прежний формат, несколько - сводка"""
+    if len(changes) == 1:
+        return [f"📢 Пользователь обновил ссылки!\n{changes[0].format()}"]
+
+    messages = []
+    header = f"📢 Пользователи обновили ссылки: {len(changes)}"
+    current = header
+    for change in changes:
+        block = change.format()
+        if len(current) + len(block) + 2 > MESSAGE_LIMIT:
+            messages.append(current)
+            current = header
+        current = f"{current}\n\n{block}"
+    messages.append(current)
+    # Отдельный блок длиннее лимита все равно нужно разбить
+    return [chunk for message in messages for chunk in split_message(message, MESSAGE_LIMIT)]
+
+
+class LinkNotifier:
+    """Уведомления канала ссылок об изменениях.
+
+    Изменения одного пользователя откладываются на debounce секунд с момента
+    последнего изменения (но не дольше max_delay), в канал уходит только итоговая
+    ссылка. Изменения, которые ничего не меняют, отбрасываются. Изменения разных
+    пользователей, готовые к отправке одновременно, объединяются в сводку.
+    """
+
+    def __init__(self, debounce=LINK_NOTIFY_DEBOUNCE, max_delay=LINK_NOTIFY_MAX_DELAY,
+                 batch_window=LINK_NOTIFY_BATCH_WINDOW):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.batch_window = batch_window
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.sent_messages = 0
+        self._pending = {}
+        self._task = None
+        self._wakeup = asyncio.Event()
+
+    def start(self):
+        """Запуск фоновой отправки уведомлений"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Остановка с немедленной постановкой накопленных изменений в очередь отправки"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        changes = list(self._pending.values())
+        self._pending.clear()
+        await self._deliver(changes)
+
+    def notify(self, user_id, username, old_link, link):
+        """Регистрация изменения ссылки пользователя; отправка произойдет позже"""
+        self.received += 1
+        change = self._pending.get(user_id)
+        if change is None:
+            if link == old_link:
+                self.dropped += 1
+                return
+            self._pending[user_id] = LinkChange(username, old_link, link, time.monotonic())
+        else:
+            change.username = username
+            change.link = link
+            change.last_at = time.monotonic()
+            change.updates += 1
+        self._wakeup.set()
+
+    def _deadline(self, change):
+        return min(change.last_at + self.debounce, change.first_at + self.max_delay)
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "received": self.received,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "sent_messages": self.sent_messages,
+        }
+
+    async def _loop(self):
+        while True:
+            now = time.monotonic()
+            deadlines = {user_id: self._deadline(change) for user_id, change in self._pending.items()}
+
+            if deadlines and min(deadlines.values()) <= now:
+                # Заодно забираем изменения, которые и так стали бы готовы в ближайшее время
+                ready = [user_id for user_id, deadline in deadlines.items() if deadline <= now + self.batch_window]
+                await self._deliver([self._pending.pop(user_id) for user_id in ready])
+                continue
+
+            self._wakeup.clear()
+            timeout = min(deadlines.values()) - now if deadlines else None
+            # asyncio.wait, а не wait_for: wait_for может поглотить отмену, если событие
+            # сработало одновременно с ней, и тогда stop() ждет задачу вечно
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=timeout)
+            finally:
+                waiter.cancel()
+
+    async def _deliver(self, changes):
+        # Пользователь мог вернуть ссылку к исходной
+        self.coalesced += sum(change.updates - 1 for change in changes)
+        changes = [change for change in changes if change.link != change.old_link]
+        if not changes:
+            return
+        try:
+            channel_id = await db.get_channel("links")
+            if not channel_id:
+                logger.warning("Links channel not configured")
+                return
+            for text in format_link_changes(changes):
+                outbox.enqueue(channel_id, text)
+                self.sent_messages += 1
+            logger.info(f"Link notification queued for {len(changes)} user(s)")
+        except Exception as e:
+            logger.error(f"Failed to queue channel notification: {e}")
+
+
+ADMIN_EVENT_TITLES = {
+    "login": "🔔 Новая авторизация!",
+    "registration": "🆕 Новая регистрация!",
+}
+
+
+class AdminEvent:
+    """Вход или регистрация пользователя, о которых нужно сообщить админам"""
+
+    def __init__(self, kind, username, full_name, telegram_id):
+        self.kind = kind
+        self.username = username
+        self.full_name = full_name
+        self.telegram_id = telegram_id
+        self.time = datetime.now()
+
+    def format(self):
+        return (
+            f"{ADMIN_EVENT_TITLES[self.kind]}\n\n"
+            f"👤 Пользователь: {self.full_name}\n"
+            f"🆔 Telegram ID: {self.telegram_id}\n"
+            f"📝 Логин: {self.username}\n"
+            f"⏰ Время: {self.time.strftime('%d.%m.%Y %H:%M:%S')}"
+        )
+
+    def format_short(self):
+        icon = ADMIN_EVENT_TITLES[self.kind].split()[0]
+        return f"{icon} {self.time.strftime('%H:%M:%S')} {self.username} - {self.full_name} ({self.telegram_id})"
+
+
+def format_admin_digest(events):
+    """Сводка событий для админов"""
+    logins = sum(1 for event in events if event.kind == "login")
+    registrations = len(events) - logins
+    header = (
+        f"📋 Сводка с {events[0].time.strftime('%H:%M:%S')} по {events[-1].time.strftime('%H:%M:%S')}\n"
+        f"Авторизаций: {logins}, регистраций: {registrations}"
+    )
+    return split_message("\n\n".join([header, "\n".join(event.format_short() for event in events)]), MESSAGE_LIMIT)
+
+
+class AdminNotifier:
+    """Уведомления админов о входах и регистрациях.
+
+    Сообщения рассылаются всем админам через outbox: параллельно и без
+    ожидания в обработчике, ошибка отправки одному админу не влияет на
+    остальных. При всплеске событий вместо отдельных сообщений админы
+    получают периодическую сводку.
+    """
+
+    def __init__(self, admin_ids=None, window=ADMIN_NOTIFY_WINDOW,
+                 threshold=ADMIN_NOTIFY_DIGEST_THRESHOLD, digest_interval=ADMIN_NOTIFY_DIGEST_INTERVAL):
+        self.admin_ids = admin_ids if admin_ids is not None else config.ADMIN_IDS
+        self.window = window
+        self.threshold = threshold
+        self.digest_interval = digest_interval
+        self._recent = deque()
+        self._digest = []
+        self._digest_task = None
+
+    def notify(self, kind, username, full_name, telegram_id):
+        """Регистрация события kind ("login" или "registration")"""
+        event = AdminEvent(kind, username, full_name, telegram_id)
+        now = time.monotonic()
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - self.window:
+            self._recent.popleft()
+
+        # Пока копится сводка, в нее попадают все события, чтобы не нарушать порядок
+        if self._digest or len(self._recent) > self.threshold:
+            self._digest.append(event)
+            if self._digest_task is None:
+                self._digest_task = asyncio.create_task(self._flush_later())
+            return
+        self._send([event.format()])
+
+    def _send(self, texts):
+        for admin_id in self.admin_ids:
+            for text in texts:
+                outbox.enqueue(admin_id, text)
+
+    def flush(self):
+        """Немедленная отправка накопленной сводки"""
+        events, self._digest = self._digest, []
+        if events:
+            self._send(format_admin_digest(events))
+            logger.info(f"Admin digest queued for {len(events)} events")
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.digest_interval)
+        finally:
+            self._digest_task = None
+        self.flush()
+
+    async def stop(self):
+        """Отправка накопленной сводки перед остановкой"""
+        if self._digest_task:
+            self._digest_task.cancel()
+            try:
+                await self._digest_task
+            except asyncio.CancelledError:
+                pass
+        self.flush()
+
+
+link_notifier = LinkNotifier()
+admin_notifier = AdminNotifier()
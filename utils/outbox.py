@@ -0,0 +1,169 @@
+import asyncio
+import logging
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramNetworkError, TelegramServerError, TelegramAPIError
+
+import config
+from utils.broadcast import ChatRateLimiter
+from utils.metrics import registry, Gauge, CallbackCounter
+
+logger = logging.getLogger(__name__)
+
+# Сколько уведомлений отправляется одновременно
+OUTBOX_CONCURRENCY = getattr(config, "OUTBOX_CONCURRENCY", 4)
+OUTBOX_MAX_RETRIES = getattr(config, "OUTBOX_MAX_RETRIES", 5)
+# Задержка перед первым повтором, секунды; дальше удваивается
+OUTBOX_RETRY_DELAY = getattr(config, "OUTBOX_RETRY_DELAY", 1.0)
+OUTBOX_MAX_SIZE = getattr(config, "OUTBOX_MAX_SIZE", 10000)
+OUTBOX_PER_CHAT_INTERVAL = getattr(config, "OUTBOX_PER_CHAT_INTERVAL", 1.0)
+
+
+class OutboxItem:
+    """Сообщение, ожидающее отправки"""
+
+    def __init__(self, chat_id, text, kwargs):
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.attempts = 0
+
+
+class Outbox:
+    """Очередь служебных сообщений (уведомления каналов и админов).
+
+    Обработчики только ставят сообщение в очередь и сразу отвечают пользователю.
+    Фоновые задачи отправляют сообщения, не больше concurrency одновременно,
+    с повторами при сетевых ошибках и TelegramRetryAfter. Очередь хранится
+    в памяти: при остановке бота оставшиеся сообщения отправляются перед выходом.
+    """
+
+    def __init__(self, concurrency=OUTBOX_CONCURRENCY, max_retries=OUTBOX_MAX_RETRIES,
+                 retry_delay=OUTBOX_RETRY_DELAY, max_size=OUTBOX_MAX_SIZE,
+                 per_chat_interval=OUTBOX_PER_CHAT_INTERVAL):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize=max_size)
+        self._chat_limiter = ChatRateLimiter(per_chat_interval)
+        # Отложенные повторы: handle -> item
+        self._delayed = {}
+        self._workers = []
+        self._bot = None
+
+    def start(self, bot):
+        """Запуск фоновых отправителей"""
+        self._bot = bot
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout=10):
+        """Отправка оставшихся сообщений (не дольше timeout секунд) и остановка"""
+        # Отложенные повторы выполняем сразу
+        for handle, item in list(self._delayed.items()):
+            handle.cancel()
+            self._put(item)
+        self._delayed.clear()
+        if self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Outbox stopped with {self._queue.qsize()} undelivered messages")
+            if self._delayed:
+                logger.warning(f"Outbox stopped with {len(self._delayed)} messages waiting for retry")
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+
+    def enqueue(self, chat_id, text, **kwargs):
+        """Постановка сообщения в очередь; возвращает False, если очередь переполнена"""
+        return self._put(OutboxItem(chat_id, text, kwargs))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"Outbox is full, message to {item.chat_id} dropped")
+            return False
+
+    def _retry_later(self, item, delay):
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._delayed.pop(handle, None)
+            self._put(item)
+
+        handle = loop.call_later(delay, requeue)
+        self._delayed[handle] = item
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "delayed": len(self._delayed),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dropped": self.dropped,
+        }
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._send(item)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, item):
+        item.attempts += 1
+        try:
+            await self._chat_limiter.wait(item.chat_id)
+            await self._bot.send_message(item.chat_id, item.text, **item.kwargs)
+            self.sent += 1
+            return
+        except TelegramRetryAfter as e:
+            # Ограничение Telegram не считаем неудачной попыткой
+            item.attempts -= 1
+            delay = e.retry_after
+        except (TelegramNetworkError, TelegramServerError) as e:
+            if item.attempts > self.max_retries:
+                self.failed += 1
+                logger.error(f"Failed to deliver message to {item.chat_id} after {item.attempts} attempts: {e}")
+                return
+            delay = self.retry_delay * 2 ** (item.attempts - 1)
+        except TelegramAPIError as e:
+            # Ошибка запроса (чат не найден, бот заблокирован) повтором не исправить
+            self.failed += 1
+            logger.error(f"Failed to deliver message to {item.chat_id}: {e}")
+            return
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Failed to deliver message to {item.chat_id}: {e}")
+            return
+
+        self.retries += 1
+        logger.debug(f"Retrying message to {item.chat_id} in {delay}s")
+        self._retry_later(item, delay)
+
+
+outbox = Outbox()
+
+# Размер очередей меняется в обе стороны, итоги доставки только растут
+OUTBOX_QUEUES = ("queued", "delayed")
+
+registry.register(Gauge(
+    "bot_outbox_messages", "Outbox messages waiting for delivery by queue",
+    lambda: {(name,): value for name, value in outbox.stats().items() if name in OUTBOX_QUEUES},
+    ("state",)
+))
+registry.register(CallbackCounter(
+    "bot_outbox_messages_total", "Outbox delivery results and retries",
+    lambda: {(name,): value for name, value in outbox.stats().items() if name not in OUTBOX_QUEUES},
+    ("result",)
+))
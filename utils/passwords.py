@@ -0,0 +1,95 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from utils.tracing import span
+
+# Параметры scrypt: n=2**14, r=8 - около 16 МиБ памяти и десятков миллисекунд CPU на хеш
+PASSWORD_SCRYPT_N = getattr(config, "PASSWORD_SCRYPT_N", 2 ** 14)
+PASSWORD_SCRYPT_R = getattr(config, "PASSWORD_SCRYPT_R", 8)
+PASSWORD_SCRYPT_P = getattr(config, "PASSWORD_SCRYPT_P", 1)
+# Сколько хешей считается одновременно; остальные запросы ждут в очереди пула
+PASSWORD_HASH_WORKERS = getattr(config, "PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))
+
+SCHEME = "scrypt"
+SALT_SIZE = 16
+KEY_SIZE = 32
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r, dklen=KEY_SIZE
+    )
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode()
+
+
+def hash_password(password):
+    """Хеш пароля в формате scrypt$n$r$p$соль$ключ"""
+    salt = os.urandom(SALT_SIZE)
+    n, r, p = PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+    key = _scrypt(password, salt, n, r, p)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+
+def is_hashed(stored):
+    return stored.startswith(SCHEME + "$")
+
+
+def verify_password(password, stored):
+    """Проверка пароля; stored - хеш или пароль открытым текстом из старых записей"""
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode())
+    try:
+        _, n, r, p, salt, key = stored.split("$")
+        expected = base64.b64decode(key)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def needs_rehash(stored):
+    """Нужно ли пересчитать хеш: пароль хранится открытым текстом или с устаревшими параметрами"""
+    if not is_hashed(stored):
+        return True
+    _, n, r, p, _, _ = stored.split("$")
+    return (int(n), int(r), int(p)) != (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+
+
+class PasswordHasher:
+    """Хеширование паролей вне цикла событий.
+
+    hashlib.scrypt отпускает GIL, поэтому потоки пула считают хеши параллельно,
+    а число одновременных вычислений (и потребление памяти) ограничено
+    размером пула: всплеск входов ставится в очередь, а не останавливает бота.
+    """
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+
+    async def hash(self, password):
+        loop = asyncio.get_running_loop()
+        with span("password.hash"):
+            return await loop.run_in_executor(self._executor, hash_password, password)
+
+    async def verify(self, password, stored):
+        if not is_hashed(stored):
+            # Старая запись с открытым паролем, сравнение дешевое
+            return verify_password(password, stored)
+        loop = asyncio.get_running_loop()
+        with span("password.verify"):
+            return await loop.run_in_executor(self._executor, verify_password, password, stored)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher()
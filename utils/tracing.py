@@ -0,0 +1,232 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Файл, в который пишутся спаны (по одному JSON на строку); по умолчанию трассировка выключена
+TRACE_FILE = getattr(config, "TRACE_FILE", None)
+# Доля обновлений, для которых собирается трасса
+TRACE_SAMPLE_RATE = getattr(config, "TRACE_SAMPLE_RATE", 0.1)
+# Сохраняются только трассы обновлений, обработка которых заняла не меньше (секунды)
+TRACE_MIN_DURATION = getattr(config, "TRACE_MIN_DURATION", 0.1)
+TRACE_FLUSH_INTERVAL = getattr(config, "TRACE_FLUSH_INTERVAL", 1.0)
+# Размер файла, после которого он переименовывается в TRACE_FILE.1 (старые сдвигаются
+# до TRACE_BACKUP_COUNT), и число хранимых старых файлов
+TRACE_MAX_BYTES = getattr(config, "TRACE_MAX_BYTES", 50 * 1024 * 1024)
+TRACE_BACKUP_COUNT = getattr(config, "TRACE_BACKUP_COUNT", 3)
+
+# Текущий спан; наследуется задачами asyncio, созданными внутри обработки обновления
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Trace:
+    """Спаны одного обновления"""
+
+    def __init__(self):
+        self.trace_id = _new_id(128)
+        self.spans = []
+
+
+class Span:
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._started
+        self.trace.spans.append(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.start_ns + int(self.duration * 1e9),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def current_trace_id():
+    """ID трассы текущего обновления или None"""
+    current = _current_span.get()
+    return current.trace.trace_id if current else None
+
+
+@contextmanager
+def _activate(current):
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "ERROR"
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Дочерний спан текущей трассы; вне трассы ничего не записывает и возвращает None"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _activate(Span(parent.trace, name, parent.span_id, attributes)) as current:
+        yield current
+
+
+class JsonLinesExporter:
+    """Запись завершенных трасс в JSON Lines файл.
+
+    Спаны копятся в памяти и дописываются в файл фоновой задачей в потоке,
+    чтобы запись на диск не задерживала обработку обновлений. Файл больше
+    max_bytes переименовывается, как у logging.handlers.RotatingFileHandler,
+    так что на диске занято не больше max_bytes * (backup_count + 1).
+    """
+
+    def __init__(self, path=TRACE_FILE, flush_interval=TRACE_FLUSH_INTERVAL,
+                 max_bytes=TRACE_MAX_BYTES, backup_count=TRACE_BACKUP_COUNT):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._buffer = []
+        self._task = None
+
+    def export(self, trace):
+        self._buffer.extend(json.dumps(item.to_dict(), ensure_ascii=False) for item in trace.spans)
+
+    def start(self):
+        if self._task is None and self.path:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        if not self._buffer or not self.path:
+            return
+        lines, self._buffer = self._buffer, []
+        await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+
+    def _write(self, lines):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    def _rotate(self):
+        """traces.jsonl -> traces.jsonl.1 -> ... -> traces.jsonl.N, самый старый удаляется"""
+        if not self.backup_count:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write traces: {e}")
+
+
+exporter = JsonLinesExporter()
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Корневой спан обновления; регистрируется как outer middleware на dp.update"""
+
+    def __init__(self, sample_rate=TRACE_SAMPLE_RATE, min_duration=TRACE_MIN_DURATION):
+        self.sample_rate = sample_rate
+        self.min_duration = min_duration
+
+    async def __call__(self, handler, event, data):
+        if random.random() >= self.sample_rate:
+            return await handler(event, data)
+
+        user = data.get("event_from_user")
+        root = Span(Trace(), "update", attributes={
+            "update.id": event.update_id,
+            "update.type": event.event_type,
+            "user.id": user.id if user else None,
+        })
+        try:
+            with _activate(root):
+                return await handler(event, data)
+        finally:
+            if root.duration >= self.min_duration:
+                exporter.export(root.trace)
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """Спан вокруг выбранного обработчика (inner middleware)"""
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        with span(f"handler.{name}"):
+            return await handler(event, data)
+
+
+class TelegramTracingMiddleware(BaseRequestMiddleware):
+    """Спан вокруг каждого запроса к Bot API"""
+
+    async def __call__(self, make_request, bot, method):
+        with span(f"telegram.{method.__api_method__}"):
+            return await make_request(bot, method)
+
+
+def setup_tracing(dp, bot):
+    """Подключение трассировки к диспетчеру и сессии бота"""
+    if not TRACE_FILE:
+        return
+    dp.update.outer_middleware(TracingMiddleware())
+    for event in ("message", "callback_query"):
+        dp.observers[event].middleware(HandlerTracingMiddleware())
+    bot.session.middleware(TelegramTracingMiddleware())
@@ -0,0 +1,74 @@
+import csv
+import io
+
+# Колонки файла импорта; link необязательна
+IMPORT_COLUMNS = ("username", "password", "link")
+EXPORT_COLUMNS = ("id", "username", "telegram_id", "link")
+MAX_USERNAME_LENGTH = 64
+
+
+def _rows(text):
+    """Строки CSV с автоопределением разделителя (запятая или точка с запятой)"""
+    sample = text[:4096]
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(io.StringIO(text), dialect)
+
+
+def parse_users_csv(data):
+    """Разбор файла импорта пользователей.
+
+    Возвращает (users, errors): users - список (номер строки, username, password, link),
+    errors - список (номер строки, причина) для строк, которые импортировать нельзя.
+    Первая строка считается заголовком, если в ней есть колонка username.
+    """
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # Excel в русской локали сохраняет CSV в cp1251
+        text = data.decode("cp1251")
+    users = []
+    errors = []
+    seen = {}
+    columns = {name: index for index, name in enumerate(IMPORT_COLUMNS)}
+
+    for line_number, row in enumerate(_rows(text), start=1):
+        if not any(cell.strip() for cell in row):
+            continue
+        cells = [cell.strip() for cell in row]
+        if line_number == 1 and "username" in (cell.lower() for cell in cells):
+            header = [cell.lower() for cell in cells]
+            if "password" not in header:
+                errors.append((line_number, "в заголовке нет колонки password"))
+                return [], errors
+            columns = {name: header.index(name) for name in IMPORT_COLUMNS if name in header}
+            continue
+
+        def cell(name):
+            index = columns.get(name)
+            return cells[index] if index is not None and index < len(cells) else ""
+
+        username, password, link = cell("username"), cell("password"), cell("link")
+        if not username or not password:
+            errors.append((line_number, "не указан логин или пароль"))
+        elif len(username) > MAX_USERNAME_LENGTH:
+            errors.append((line_number, f"логин длиннее {MAX_USERNAME_LENGTH} символов"))
+        elif username in seen:
+            errors.append((line_number, f"логин {username} уже был в строке {seen[username]}"))
+        else:
+            seen[username] = line_number
+            users.append((line_number, username, password, link or None))
+    return users, errors
+
+
+def write_users_csv(rows, file):
+    """Запись пользователей (id, username, telegram_id, link) в текстовый файл построчно"""
+    writer = csv.writer(file)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        count += 1
+    return count
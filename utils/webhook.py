@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+import config
+from utils.dispatch import OrderedDispatcher
+
+logger = logging.getLogger(__name__)
+
+# Публичный адрес бота; если задан, бот работает через вебхук вместо long polling
+WEBHOOK_URL = getattr(config, "WEBHOOK_URL", None)
+WEBHOOK_PATH = getattr(config, "WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = getattr(config, "WEBHOOK_SECRET", None)
+WEBAPP_HOST = getattr(config, "WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = getattr(config, "WEBAPP_PORT", 8080)
+# Сколько обновлений обрабатывается одновременно
+WEBHOOK_CONCURRENCY = getattr(config, "WEBHOOK_CONCURRENCY", 64)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Обработчик вебхука, который сразу отвечает Telegram и обрабатывает
+    обновления в фоне, не больше concurrency одновременно.
+
+    У OrderedDispatcher собственное общее ограничение, которое учитывает очереди
+    пользователей, поэтому для него семафор обработчика не используется: иначе
+    обновления, ждущие своей очереди, занимали бы его места.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, concurrency=WEBHOOK_CONCURRENCY, **kwargs):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self._semaphore = None if isinstance(dispatcher, OrderedDispatcher) else asyncio.Semaphore(concurrency)
+
+    async def _background_feed_update(self, bot, update):
+        if self._semaphore is None:
+            return await self._feed_update(bot, update)
+        async with self._semaphore:
+            await self._feed_update(bot, update)
+
+    async def _feed_update(self, bot, update):
+        try:
+            await super()._background_feed_update(bot, update)
+        except Exception as e:
+            logger.error(f"Failed to process webhook update: {e}")
+
+
+def create_webhook_app(dispatcher: Dispatcher, bot: Bot, path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET,
+                       concurrency=WEBHOOK_CONCURRENCY, **data):
+    """aiohttp-приложение, принимающее обновления Telegram по path"""
+    app = web.Application()
+    BoundedRequestHandler(
+        dispatcher,
+        bot,
+        concurrency=concurrency,
+        secret_token=secret_token,
+        **data
+    ).register(app, path=path)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot, stop: asyncio.Event):
+    """Регистрация вебхука в Telegram и обслуживание обновлений до установки stop"""
+    app = create_webhook_app(dispatcher, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT)
+    await site.start()
+    logger.info(f"Webhook server listening on {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+
+    try:
+        await bot.set_webhook(
+            f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            drop_pending_updates=True,
+            allowed_updates=dispatcher.resolve_used_update_types()
+        )
+        await stop.wait()
+    finally:
+        await runner.cleanup()
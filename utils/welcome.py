@@ -0,0 +1,93 @@
+import logging
+from html.parser import HTMLParser
+
+import config
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Теги, которые Telegram поддерживает в parse_mode="HTML"
+TELEGRAM_HTML_TAGS = {
+    "b", "strong", "i", "em", "u", "ins", "s", "strike", "del",
+    "span", "tg-spoiler", "a", "code", "pre", "blockquote", "tg-emoji",
+}
+
+
+class _TelegramHTMLValidator(HTMLParser):
+    """Проверка, что текст использует только поддерживаемые Telegram теги и все они закрыты"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.valid = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in TELEGRAM_HTML_TAGS:
+            self.valid = False
+        self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.valid = False
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack.pop() != tag:
+            self.valid = False
+
+
+def is_valid_telegram_html(text):
+    """Проверка HTML-разметки приветствия до отправки в Telegram"""
+    validator = _TelegramHTMLValidator()
+    try:
+        validator.feed(text)
+        validator.close()
+    except Exception:
+        return False
+    return validator.valid and not validator.stack
+
+
+class WelcomeMessage:
+    """Подготовленное к отправке приветствие"""
+
+    def __init__(self, version, text):
+        self.version = version
+        self.text = text
+        # Разметка проверяется один раз при загрузке, а не при каждой отправке
+        self.parse_mode = "HTML" if is_valid_telegram_html(text) else None
+
+
+class WelcomeStore:
+    """Версионированное приветственное сообщение с кэшем в памяти.
+
+    Каждое изменение сохраняется новой версией в таблице welcome_messages,
+    в памяти хранится только текущая версия.
+    """
+
+    def __init__(self):
+        self._current = None
+
+    async def get(self):
+        """Текущее приветствие (WelcomeMessage)"""
+        if self._current is None:
+            await self._load()
+        return self._current
+
+    async def update(self, text, author_id=None):
+        """Сохранение новой версии приветствия; кэш обновляется сразу"""
+        version = await db.add_welcome_message(text, author_id)
+        self._current = WelcomeMessage(version, text)
+        logger.info(f"Welcome message updated to version {version}")
+        return self._current
+
+    async def _load(self):
+        row = await db.get_welcome_message()
+        if row is None:
+            # Первый запуск: переносим приветствие из config в базу
+            legacy = getattr(config, "get_welcome_message", None)
+            text = legacy() if legacy else "Добро пожаловать!"
+            await self.update(text)
+            return
+        self._current = WelcomeMessage(*row)
+
+
+# Глобальное хранилище приветствия
+welcome_store = WelcomeStore()